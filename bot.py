@@ -6,14 +6,14 @@ core functionality.
 from __future__ import annotations
 
 import asyncio
+import collections
 import datetime
 import logging
-import logging.handlers
 import re
 import subprocess
-import traceback
-import uuid
-from typing import TYPE_CHECKING, Any, Literal
+import time
+from collections.abc import Awaitable, Callable
+from typing import TYPE_CHECKING, Literal
 
 import aiohttp
 import discord
@@ -21,11 +21,11 @@ from beanie import init_beanie
 from discord import app_commands
 from discord.ext import commands
 from motor.motor_asyncio import AsyncIOMotorClient
-from rich.logging import RichHandler
 
 import src.mongo.models
 from commandchecks import is_staff_from_ctx
 from env import env
+from src.discord.features import MessageFeatures
 from src.discord.globals import (
     CHANNEL_BOTSPAM,
     CHANNEL_DELETEDM,
@@ -33,18 +33,139 @@ from src.discord.globals import (
     CHANNEL_EDITEDM,
     CHANNEL_RULES,
 )
+from src.discord.logconfig import MESSAGE_LOGGER, setup_logging
+from src.discord.panels import PanelManager
 from src.discord.reporter import Reporter
+from src.discord.startup import StartupManager
+from src.discord.webhooks import WebhookPool
 
 if TYPE_CHECKING:
-    from src.discord.censor import Censor
+    from src.discord.entities import EntityRegistry
     from src.discord.logger import Logger
-    from src.discord.spam import SpamManager
 
 intents = discord.Intents.all()
 logger = logging.getLogger(__name__)
+message_logger = logging.getLogger(MESSAGE_LOGGER)
 
 BOT_PREFIX = "?" if env.dev_mode else "!"
 
+# A pipeline stage; returns True if later stages should not see the message
+MessageStageHandler = Callable[
+    [discord.Message, MessageFeatures],
+    Awaitable[bool | None],
+]
+
+
+class StageLatency:
+    """
+    The latency of a message pipeline stage over its recent runs.
+    """
+
+    __slots__ = ("count", "errors", "samples")
+
+    count: int
+    errors: int
+    # The latency of the most recent runs, in seconds
+    samples: collections.deque[float]
+
+    def __init__(self, max_samples: int = 512):
+        self.count = 0
+        self.errors = 0
+        self.samples = collections.deque(maxlen=max_samples)
+
+    def percentile(self, fraction: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class MessagePipeline:
+    """
+    The single path every guild message takes through the cogs which inspect it.
+
+    Cogs register stages with a priority. Stages run in order of priority, and
+    stages sharing a priority are independent of each other, so they run
+    concurrently. A stage which returns True (such as the censor deleting the
+    message) short-circuits the pipeline: stages with a later priority do not
+    run. The latency of every stage is recorded.
+    """
+
+    # Maps the name of each stage to its priority and handler
+    stages: dict[str, tuple[int, MessageStageHandler]]
+    latencies: dict[str, StageLatency]
+
+    # Stages slower than this are logged
+    slow_stage_seconds = 1.0
+
+    def __init__(self):
+        self.stages = {}
+        self.latencies = {}
+        self._groups: list[list[tuple[str, MessageStageHandler]]] = []
+
+    def register(self, name: str, priority: int, handler: MessageStageHandler) -> None:
+        """
+        Registers a stage, replacing any stage of the same name. Lower priorities
+        run first.
+        """
+        self.stages[name] = (priority, handler)
+        self.latencies.setdefault(name, StageLatency())
+        self._regroup()
+
+    def unregister(self, name: str) -> None:
+        """
+        Removes a stage, such as when its cog is unloaded.
+        """
+        self.stages.pop(name, None)
+        self._regroup()
+
+    def _regroup(self) -> None:
+        groups: dict[int, list[tuple[str, MessageStageHandler]]] = {}
+        for name, (priority, handler) in self.stages.items():
+            groups.setdefault(priority, []).append((name, handler))
+        self._groups = [groups[priority] for priority in sorted(groups)]
+
+    async def _run_stage(
+        self,
+        name: str,
+        handler: MessageStageHandler,
+        message: discord.Message,
+        features: MessageFeatures,
+    ) -> bool:
+        latency = self.latencies[name]
+        start = time.perf_counter()
+        try:
+            return bool(await handler(message, features))
+        except Exception:
+            latency.errors += 1
+            logger.exception(f"Error in message pipeline stage {name}")
+            return False
+        finally:
+            elapsed = time.perf_counter() - start
+            latency.count += 1
+            latency.samples.append(elapsed)
+            if elapsed > self.slow_stage_seconds:
+                logger.warning(f"Message pipeline stage {name} took {elapsed:.2f}s")
+
+    async def run(self, message: discord.Message, features: MessageFeatures) -> None:
+        """
+        Runs a message through every stage.
+        """
+        for group in self._groups:
+            if len(group) == 1:
+                name, handler = group[0]
+                stop = await self._run_stage(name, handler, message, features)
+            else:
+                results = await asyncio.gather(
+                    *(
+                        self._run_stage(name, handler, message, features)
+                        for name, handler in group
+                    ),
+                )
+                stop = any(results)
+            if stop:
+                return
+
 
 class PiBotCommandTree(app_commands.CommandTree):
     def __init__(self, client: PiBot):
@@ -138,6 +259,12 @@ class PiBot(commands.Bot):
     session: aiohttp.ClientSession | None
     mongo_client: AsyncIOMotorClient
     settings: src.mongo.models.Settings
+    webhooks: WebhookPool
+    panels: PanelManager
+    pipeline: MessagePipeline
+    startup: StartupManager
+    # Set by the EntityRegistry cog while it is loaded
+    entities: EntityRegistry | None
 
     def __init__(self):
         super().__init__(
@@ -147,13 +274,19 @@ class PiBot(commands.Bot):
             help_command=None,
             tree_cls=PiBotCommandTree,
         )
-        self.listeners_: dict[
-            str,
-            dict[str, Any],
-        ] = {}  # name differentiation between internal _listeners attribute
+        # Maps a user's id to the (channel id, future) pairs waiting for their next message
+        self.response_waiters: dict[
+            int,
+            list[tuple[int | None, asyncio.Future[discord.Message]]],
+        ] = {}
         self.__version__ = "v5.1.0"
         self.__commit__ = self.get_commit()
         self.session = None
+        self.webhooks = WebhookPool(self)
+        self.panels = PanelManager(self)
+        self.pipeline = MessagePipeline()
+        self.startup = StartupManager(self)
+        self.entities = None
         self.mongo_client = AsyncIOMotorClient(
             env.mongo_url,
             tz_aware=True,
@@ -181,16 +314,20 @@ class PiBot(commands.Bot):
             database=self.mongo_client["data"],
             document_models=[
                 src.mongo.models.Cron,
+                src.mongo.models.CronDeadLetter,
                 src.mongo.models.Ping,
                 src.mongo.models.Tag,
                 src.mongo.models.Invitational,
                 src.mongo.models.Event,
                 src.mongo.models.Censor,
                 src.mongo.models.Settings,
+                src.mongo.models.MemberCountDay,
+                src.mongo.models.Panel,
                 # TODO
             ],
         )
         extensions = (
+            "src.discord.entities",
             "src.discord.censor",
             "src.discord.ping",
             "src.discord.welcome",
@@ -208,13 +345,17 @@ class PiBot(commands.Bot):
             "src.discord.reporter",
             "src.discord.logger",
         )
-        for i, extension in enumerate(extensions):
-            try:
-                await self.load_extension(extension)
-                logger.info(f"Enabled extension: {extension} {i + 1}/{len(extensions)}")
-            except commands.ExtensionError:
-                logger.error(f"Failed to load extension {extension}!")
-                traceback.print_exc()
+        await self.startup.load_extensions(extensions)
+        self.startup.start_wiki()
+
+    async def add_cog(self, cog: commands.Cog, /, **kwargs) -> None:
+        """
+        Adds a cog, recording how long it took towards the startup timing of the
+        extension being loaded.
+        """
+        start = time.perf_counter()
+        await super().add_cog(cog, **kwargs)
+        self.startup.record_setup(time.perf_counter() - start)
 
     async def on_ready(self) -> None:
         """
@@ -232,18 +373,22 @@ class PiBot(commands.Bot):
         assert isinstance(server, discord.Guild)
         rules_channel = discord.utils.get(server.text_channels, name=CHANNEL_RULES)
         assert isinstance(rules_channel, discord.TextChannel)
-        rules_message = [m async for m in rules_channel.history(limit=1)]
-        if rules_message:
-            rules_message = rules_message[0]
-            view = discord.ui.View()
-            view.add_item(
-                discord.ui.Button(
-                    url="https://scioly.org/rules",
-                    label="Complete Scioly.org rules",
-                    style=discord.ButtonStyle.link,
-                ),
-            )
-            await rules_message.edit(view=view)
+        view = discord.ui.View()
+        view.add_item(
+            discord.ui.Button(
+                url="https://scioly.org/rules",
+                label="Complete Scioly.org rules",
+                style=discord.ButtonStyle.link,
+            ),
+        )
+        await self.panels.ensure("rules", rules_channel, create=False, view=view)
+
+    async def on_raw_message_delete(
+        self,
+        payload: discord.RawMessageDeleteEvent,
+    ) -> None:
+        # Re-create panels whose message was deleted
+        await self.panels.forget(payload.message_id)
 
     async def on_message(self, message: discord.Message) -> None:
         # Nothing needs to be done to the bot's own messages
@@ -251,16 +396,22 @@ class PiBot(commands.Bot):
             return
 
         # If user is being listened to, return their message
-        for listener in self.listeners_.items():
-            if message.author.id == listener[1]["follow_id"]:
-                listener[1]["message"] = message
+        waiters = self.response_waiters.get(message.author.id)
+        if waiters:
+            for channel_id, future in waiters:
+                if (
+                    channel_id is None or channel_id == message.channel.id
+                ) and not future.done():
+                    future.set_result(message)
 
         # Log incoming direct messages
         if isinstance(message.channel, discord.DMChannel) and message.author != bot:
             logger_cog: commands.Cog | Logger = self.get_cog("Logger")
             await logger_cog.send_to_dm_log(message)
-            logger.info(
-                f"Message from {message.author} through DM's: {message.content}",
+            message_logger.info(
+                "Message from %s through DM's: %s",
+                message.author,
+                message.content,
             )
         else:
             # Print to output
@@ -270,8 +421,11 @@ class PiBot(commands.Bot):
                 in [CHANNEL_EDITEDM, CHANNEL_DELETEDM, CHANNEL_DMLOG]
             ):
                 # avoid sending logs for messages in log channels
-                logger.info(
-                    f"Message from {message.author} in #{message.channel}: {message.content}",
+                message_logger.info(
+                    "Message from %s in #%s: %s",
+                    message.author,
+                    message.channel,
+                    message.content,
                 )
 
         # Check if the message contains a censored word/emoji
@@ -281,12 +435,9 @@ class PiBot(commands.Bot):
         )
 
         if message.content and not is_private:
-            censor: commands.Cog | Censor = self.get_cog("Censor")
-            await censor.on_message(message)
-
-            # Check to see if the message contains repeated content or has too many caps
-            spam: commands.Cog | SpamManager = self.get_cog("SpamManager")
-            await spam.store_and_validate(message)
+            # Computed once here and shared with every pipeline stage
+            features = MessageFeatures.for_message(message)
+            await self.pipeline.run(message, features)
 
         legacy_command: list[str] = re.findall(
             rf"^{re.escape(BOT_PREFIX)}\s*(\w+)",
@@ -323,33 +474,36 @@ class PiBot(commands.Bot):
         self,
         follow_id: int,
         timeout: int,
+        channel_id: int | None = None,
     ) -> discord.Message | None:
         """
-        Creates a global listener for a message from a user.
+        Waits for the next message from a user. The message is delivered as soon
+        as it is received, and the waiter is removed once it resolves or times out.
 
         Args:
             follow_id: the user ID to create the listener for
             timeout: the amount of time to wait before returning None, assuming
                 the user abandoned the operation
+            channel_id: if given, only a message sent in this channel is returned
 
         Returns:
             the found message or None
         """
-        my_id = str(uuid.uuid4())
-        self.listeners_[my_id] = {
-            "follow_id": follow_id,
-            "timeout": timeout,
-            "message": None,
-        }
-        count = timeout
-        while count > 0:
-            await asyncio.sleep(1)
-            count -= 1
-            if self.listeners_[my_id]["message"] is not None:
-                message = self.listeners_[my_id]["message"]
-                del self.listeners_[my_id]
-                return message
-        return None
+        future: asyncio.Future[
+            discord.Message
+        ] = asyncio.get_running_loop().create_future()
+        waiter = (channel_id, future)
+        self.response_waiters.setdefault(follow_id, []).append(waiter)
+        try:
+            return await asyncio.wait_for(future, timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            waiters = self.response_waiters.get(follow_id)
+            if waiters is not None:
+                waiters.remove(waiter)
+                if not waiters:
+                    del self.response_waiters[follow_id]
 
     async def sync_commands(
         self,
@@ -375,15 +529,6 @@ class PiBot(commands.Bot):
 
 
 bot = PiBot()
-KB = 1024
-MB = 1024 * KB
-handler = logging.handlers.RotatingFileHandler(
-    filename="pibot.log",
-    encoding="utf-8",
-    maxBytes=32 * MB,
-    backupCount=5,
-)
-discord.utils.setup_logging(handler=handler)
 
 
 @bot.command(
@@ -459,9 +604,8 @@ async def main(token: str):
 
 
 if __name__ == "__main__":
-    logger = logging.getLogger()
-    if env.dev_mode:
-        logger.addHandler(RichHandler(level=logging.DEBUG, rich_tracebacks=True))
-    else:
-        logger.addHandler(RichHandler(level=logging.INFO, rich_tracebacks=False))
-    asyncio.run(main(env.discord_token))
+    listener = setup_logging(env.dev_mode)
+    try:
+        asyncio.run(main(env.discord_token))
+    finally:
+        listener.stop()
@@ -5,6 +5,7 @@ Stores various checks for specific commands, including privileged commands.
 import discord
 from discord.ext import commands
 
+from src.discord.entities import is_staff
 from src.discord.globals import ROLE_STAFF, ROLE_VIP
 
 
@@ -15,12 +16,9 @@ def is_in_dms(interaction: discord.Interaction):
 def is_in_bot_spam(interaction: discord.Interaction):
     guild = interaction.guild
     assert isinstance(guild, discord.Guild)
-    staff_role = discord.utils.get(guild.roles, name=ROLE_STAFF)
-    vip_role = discord.utils.get(guild.roles, name=ROLE_VIP)
-
     assert isinstance(interaction.user, discord.Member)
 
-    if staff_role in interaction.user.roles or vip_role in interaction.user.roles:
+    if is_staff(interaction.client, interaction.user):
         return True
 
     if isinstance(interaction.channel, discord.abc.GuildChannel | discord.Thread):
@@ -50,13 +48,9 @@ def is_staff_from_ctx(
     """
     guild = ctx.guild
     member = ctx.author if isinstance(ctx, commands.Context) else ctx.user
+    client = ctx.bot if isinstance(ctx, commands.Context) else ctx.client
     assert isinstance(guild, discord.Guild)
 
-    staff_role = discord.utils.get(guild.roles, name=ROLE_STAFF)
-    vip_role = discord.utils.get(guild.roles, name=ROLE_VIP)
-    assert isinstance(staff_role, discord.Role)
-    assert isinstance(vip_role, discord.Role)
-
     if isinstance(member, discord.User):
         member = guild.get_member(member.id)
         assert isinstance(
@@ -64,10 +58,10 @@ def is_staff_from_ctx(
             discord.Member,
         )  # If this fails, user isn't in server anyways
 
-    if any(r in [staff_role, vip_role] for r in member.roles):
+    if is_staff(client, member):
         return True
 
     if no_raise:
         return False  # Option for evading default behavior of raising error
 
-    raise commands.MissingAnyRole([str(staff_role), str(vip_role)])
+    raise commands.MissingAnyRole([ROLE_STAFF, ROLE_VIP])
@@ -4,22 +4,24 @@ server.
 """
 from __future__ import annotations
 
-import asyncio
-import contextlib
+import collections
+import hashlib
 import logging
-import re
 from typing import TYPE_CHECKING
 
 import discord
 from discord.ext import commands
 
 import src.discord.globals
+from src.discord.features import MessageFeatures
 from src.discord.globals import (
     CATEGORY_STAFF,
     CHANNEL_SUPPORT,
     DISCORD_INVITE_ENDINGS,
     ROLE_UC,
 )
+from src.discord.logconfig import EDIT_LOGGER
+from src.discord.matching import CensorMatcher, MatchPoolFullError, MatchWorkerPool
 
 if TYPE_CHECKING:
     from bot import PiBot
@@ -27,6 +29,87 @@ if TYPE_CHECKING:
     from .reporter import Reporter
 
 logger = logging.getLogger(__name__)
+edit_logger = logging.getLogger(EDIT_LOGGER)
+
+
+class VerdictCache:
+    """
+    An LRU cache of censor results, keyed by the censor list version and a hash
+    of the exact content given to the matcher. Repeated content (spammers
+    repeating a line, edits which did not change the text, unchanged nicknames)
+    then skips the matcher.
+
+    Each entry is False if the content is clean, otherwise its censored form, or
+    True if the content is only known to need censoring (it was checked but not
+    censored yet).
+
+    Because the censor list version is part of the key, every change to the list
+    invalidates all previous results.
+    """
+
+    verdicts: collections.OrderedDict[tuple[int, bytes], bool | str]
+    hits: int
+    misses: int
+
+    def __init__(self, max_size: int = 4096):
+        self.max_size = max_size
+        self.verdicts = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(version: int, content: str) -> tuple[int, bytes]:
+        digest = hashlib.blake2b(
+            content.encode("utf-8", "surrogatepass"),
+            digest_size=16,
+        ).digest()
+        return version, digest
+
+    def get(
+        self,
+        version: int,
+        content: str,
+        need_censored: bool = False,
+    ) -> bool | str | None:
+        """
+        Returns the cached entry for the content if it answers the lookup, or
+        None if the matcher needs to run. Only lookups answered by the cache
+        count as hits.
+
+        Args:
+            version (int): The version of the censor list.
+            content (str): The content given to the matcher.
+            need_censored (bool): Whether the censored form of the content is
+                needed, in which case an entry only recording that the content
+                needs censoring does not answer the lookup.
+        """
+        key = self.key(version, content)
+        entry = self.verdicts.get(key)
+        if entry is None or (need_censored and entry is True):
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.verdicts.move_to_end(key)
+        return entry
+
+    def set(self, version: int, content: str, entry: bool | str) -> None:
+        """
+        Stores the result for the content. Results for older versions of the
+        censor list are dropped, since they can never be hit again.
+        """
+        if self.verdicts and next(iter(self.verdicts))[0] != version:
+            self.verdicts = collections.OrderedDict(
+                (k, v) for k, v in self.verdicts.items() if k[0] == version
+            )
+        key = self.key(version, content)
+        # Keep the censored form rather than replacing it with a bare verdict
+        if entry is True and isinstance(self.verdicts.get(key), str):
+            self.verdicts.move_to_end(key)
+            return
+        self.verdicts[key] = entry
+        self.verdicts.move_to_end(key)
+        if len(self.verdicts) > self.max_size:
+            self.verdicts.popitem(last=False)
 
 
 class Censor(commands.Cog):
@@ -34,16 +117,51 @@ class Censor(commands.Cog):
     Responsible for censoring innapropriate words' and emojis in user content.
     """
 
+    matcher: CensorMatcher
+    pool: MatchWorkerPool
+    reported_timeout_version: int | None
+    verdicts: VerdictCache
+
     def __init__(self, bot: PiBot):
         self.bot = bot
+        self.matcher = CensorMatcher()
+        self.pool = MatchWorkerPool()
+        self.verdicts = VerdictCache()
+        self.reported_timeout_version = None
+
+    async def cog_load(self) -> None:
+        # Runs before every other stage, and stops them if the message is removed
+        self.bot.pipeline.register("censor", 10, self.on_message)
+
+    async def cog_unload(self) -> None:
+        self.bot.pipeline.unregister("censor")
+        self.pool.shutdown()
 
-    async def on_message(self, message: discord.Message) -> None:
+    def refresh_matcher(self) -> None:
+        """
+        Recompiles the censor matcher from the current censor list. Must be called
+        whenever the censor list is loaded or changed.
+        """
+        self.matcher.rebuild(
+            src.discord.globals.CENSOR.words,
+            src.discord.globals.CENSOR.emojis,
+        )
+
+    async def on_message(
+        self,
+        message: discord.Message,
+        features: MessageFeatures,
+    ) -> bool:
         """
         Will censor the message. Will replace any flags in content with "<censored>".
 
         :param message: The message being checked. message.context will be modified
             if censor gets triggered if and only if the author is not a staff member.
         :type message: discord.Message
+        :param features: The precomputed features of the message.
+        :type features: MessageFeatures
+        :return: Whether the message was deleted.
+        :rtype: bool
         """
         # Type checking - Assume messages come from a text channel where the author
         # is a member of the server
@@ -51,28 +169,30 @@ class Censor(commands.Cog):
             message.author,
             discord.Member,
         ):
-            return
+            return False
 
         # Do not act on messages in staff channels
         if (
             message.channel.category is not None
             and message.channel.category.name == CATEGORY_STAFF
         ):
-            return
+            return False
 
         # Get the content and attempt to find any words on the censor list
         content = message.content
-        if await self.censor_needed(content):
+        censored_content = await self.censor_content(content)
+        if censored_content is not None:
             logger.debug(
                 f"Censoring message by {message.author} because it contained "
                 "a word or emoji on the censor list.",
             )
 
             await message.delete()
-            await self.__censor(message)
+            await self.__censor(message, censored_content)
+            return True
 
         # Check for invalid Discord invite endings
-        if self.discord_invite_censor_needed(content):
+        if self.discord_invite_censor_needed(features):
             logger.debug(
                 f"Censoring message by {message.author} because of the it mentioned "
                 "a Discord invite link.",
@@ -89,68 +209,92 @@ class Censor(commands.Cog):
                 "with rule 12. If you have "
                 f"questions, please ask in {support_channel.mention}.* ",
             )
-
-    def word_present(self, content: str) -> bool:
-        with contextlib.suppress(asyncio.CancelledError):
-            for word in src.discord.globals.CENSOR.words:
-                if re.findall(rf"\b({word})\b", content, re.I):
-                    return True
-            for emoji in src.discord.globals.CENSOR.emojis:
-                if len(re.findall(emoji, content)):
-                    return True
+            return True
         return False
 
     async def censor_needed(self, content: str) -> bool:
         """
         Determines whether the message has content that needs to be censored.
         """
+        version = self.matcher.version
+        entry = self.verdicts.get(version, content)
+        if entry is not None:
+            return entry is not False
+
         try:
-            if await asyncio.wait_for(
-                asyncio.to_thread(self.word_present, content),
-                timeout=1.5,
-            ):
-                return True
-        except asyncio.TimeoutError:
-            logger.warn(f"TimeoutError while checking for censored words in {content}")
+            verdict = await self.pool.run(self.matcher.search, content)
+            self.verdicts.set(version, content, verdict)
+            return verdict
+        except TimeoutError:
+            await self.report_timeout(content)
+        except MatchPoolFullError:
+            logger.warning("Censor worker pool is full; skipping censor check.")
         return False
 
-    def discord_invite_censor_needed(self, content: str) -> bool:
+    async def censor_content(self, content: str) -> str | None:
+        """
+        Detects and replaces censored words and emojis in a single pass.
+
+        Returns:
+            The censored content, or None if nothing needed to be censored.
+        """
+        version = self.matcher.version
+        entry = self.verdicts.get(version, content, need_censored=True)
+        if entry is not None:
+            return entry or None
+
+        try:
+            censored, count = await self.pool.run(self.matcher.censor, content)
+            self.verdicts.set(version, content, censored if count else False)
+        except TimeoutError:
+            await self.report_timeout(content)
+            return None
+        except MatchPoolFullError:
+            logger.warning("Censor worker pool is full; skipping censor check.")
+            return None
+        return censored if count else None
+
+    async def report_timeout(self, content: str) -> None:
+        """
+        Logs a censor timeout and reports it to staff. Only one report is sent per
+        version of the censor list, since the same entry will keep timing out
+        until the list is changed.
+        """
+        logger.warning(f"Timed out while checking for censored words in {content}")
+        if self.reported_timeout_version == self.matcher.version:
+            return
+        self.reported_timeout_version = self.matcher.version
+
+        reporter_cog: commands.Cog | Reporter = self.bot.get_cog("Reporter")
+        await reporter_cog.create_match_timeout_report("censor", content)
+
+    def discord_invite_censor_needed(self, features: MessageFeatures) -> bool:
         """
         Determines whether the Discord invite link censor is needed. In other
         words, whether this content contains a Discord invite link.
         """
-        if not any(
-            ending for ending in DISCORD_INVITE_ENDINGS if ending in content
-        ) and (
-            len(re.findall("discord.gg", content, re.I)) > 0
-            or len(re.findall("discord.com/invite", content, re.I)) > 0
+        if features.invite_spans and not any(
+            ending for ending in DISCORD_INVITE_ENDINGS if ending in features.content
         ):
             return True
         return False
 
-    async def __censor(self, message: discord.Message):
-        """Constructs Pi-Bot's censor."""
+    async def __censor(self, message: discord.Message, content: str):
+        """
+        Constructs Pi-Bot's censor.
+
+        Args:
+            message: The original message which was censored.
+            content: The message content with censored words already replaced.
+        """
         # Type checking
         assert isinstance(message.channel, discord.TextChannel)
         assert isinstance(message.author, discord.Member)
 
         channel = message.channel
         avatar = message.author.display_avatar.url
-        webhook = await channel.create_webhook(name="Censor (Automated)")
-        content = message.content
         author = message.author.nick or message.author.name
 
-        # Actually replace content found on the censored words/emojis list
-        for word in src.discord.globals.CENSOR.words:
-            content = re.sub(
-                rf"\b({word})\b",
-                "<censored>",
-                content,
-                flags=re.IGNORECASE,
-            )
-        for emoji in src.discord.globals.CENSOR.emojis:
-            content = re.sub(emoji, "<censored>", content, flags=re.I)
-
         reply = (
             (message.reference.resolved or message.reference.cached_message)
             if message.reference
@@ -175,14 +319,14 @@ class Censor(commands.Cog):
 
         # Make sure pinging through @everyone, @here, or any role can not happen
         mention_perms = discord.AllowedMentions(everyone=False, users=True, roles=False)
-        await webhook.send(
+        await self.bot.webhooks.send(
+            channel,
             content,
             username=f"{author} (auto-censor)",
             avatar_url=avatar,
             allowed_mentions=mention_perms,
             silent=isinstance(reply, discord.Message),
         )
-        await webhook.delete()
 
         # Replace content with censored content for other cogs
         message.content = content
@@ -201,11 +345,11 @@ class Censor(commands.Cog):
             return
 
         # Log edit event
-        logger.info(
-            "Message from {0.author} edited to: {0.content}, from: {1.content}".format(
-                after,
-                before,
-            ),
+        edit_logger.info(
+            "Message from %s edited to: %s, from: %s",
+            after.author,
+            after.content,
+            before.content,
         )
 
         # Stop the event here for DM's (no need to censor, as author is the
@@ -229,7 +373,9 @@ class Censor(commands.Cog):
             )
 
         # Delete messages that have Discord invite links in them
-        discord_invite_found = self.discord_invite_censor_needed(after.content)
+        discord_invite_found = self.discord_invite_censor_needed(
+            MessageFeatures.for_message(after),
+        )
         if discord_invite_found:
             await after.delete()
             await after.author.send(
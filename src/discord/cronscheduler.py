@@ -0,0 +1,255 @@
+"""
+Holds the in-process scheduler which executes CRON tasks at their scheduled
+time.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import datetime
+import heapq
+import itertools
+import logging
+from collections.abc import Awaitable, Callable
+
+import discord
+from beanie import PydanticObjectId
+from beanie.odm.operators.update.general import Set
+from pydantic import ValidationError
+
+from src.mongo.models import Cron, CronDeadLetter
+
+logger = logging.getLogger(__name__)
+
+
+class CronScheduler:
+    """
+    Executes CRON tasks at their scheduled time.
+
+    Tasks which failed are retried with exponential backoff: each attempt is
+    scheduled base_delay * 2 ** (attempts - 1) after the failure, and a task
+    which failed max_attempts times is moved to the dead-letter collection.
+
+    Upcoming tasks are kept in a min-heap ordered by their due time (their next
+    attempt if they are being retried, otherwise their scheduled time). The heap is
+    filled from an indexed query for the tasks due within the horizon, and the
+    scheduler sleeps until whichever comes first: the next task's deadline, the
+    end of the horizon (when the heap is refilled), or being woken up because a
+    new task was scheduled. Each task costs O(log n) to schedule and to pop.
+
+    Stored tasks are validated one at a time as they are loaded. A task which no
+    longer validates (such as one of an unknown type) is moved to the
+    dead-letter collection and passed to invalid_handler, instead of making the
+    whole load fail.
+    """
+
+    # (due time, insertion counter, task)
+    heap: list[tuple[datetime.datetime, int, Cron]]
+    # The ids of the tasks in the heap
+    scheduled: set[PydanticObjectId]
+    # The time up to which every task in the database has been loaded into the heap
+    loaded_until: datetime.datetime | None
+
+    def __init__(
+        self,
+        handler: Callable[[Cron], Awaitable[None]],
+        invalid_handler: Callable[[CronDeadLetter], Awaitable[None]] | None = None,
+        horizon: datetime.timedelta = datetime.timedelta(hours=1),
+        retry_delay: float = 60,
+        base_delay: datetime.timedelta = datetime.timedelta(minutes=1),
+        max_attempts: int = 5,
+    ):
+        self.handler = handler
+        self.invalid_handler = invalid_handler
+        self.horizon = horizon
+        self.retry_delay = retry_delay
+        self.base_delay = base_delay
+        self.max_attempts = max_attempts
+        self.heap = []
+        self.scheduled = set()
+        self.loaded_until = None
+        self._counter = itertools.count()
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """
+        Starts the scheduler, if it is not running already.
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="cron-scheduler")
+
+    def stop(self) -> None:
+        """
+        Stops the scheduler.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def add(self, task: Cron) -> None:
+        """
+        Schedules a task which was just inserted, waking the scheduler up so that
+        the task is executed on time even if it is due before the next deadline.
+        Tasks due after the horizon are picked up when the heap is next refilled.
+        """
+        if self.loaded_until is None or self.due(task) > self.loaded_until:
+            return
+        self._push(task)
+        self._wake.set()
+
+    @staticmethod
+    def due(task: Cron) -> datetime.datetime:
+        """
+        Returns when a task should next be attempted.
+        """
+        return task.next_attempt or task.time
+
+    def _push(self, task: Cron) -> None:
+        if task.id in self.scheduled:
+            return
+        self.scheduled.add(task.id)
+        heapq.heappush(self.heap, (self.due(task), next(self._counter), task))
+
+    async def load(self) -> None:
+        """
+        Loads every task due within the horizon into the heap. Tasks being
+        retried were always scheduled in the past, so they are loaded too.
+        """
+        until = discord.utils.utcnow() + self.horizon
+        # Extend the horizon before querying, so that tasks added while the
+        # query runs are pushed by add() rather than missed until the next load
+        previous, self.loaded_until = self.loaded_until, until
+        try:
+            collection = Cron.get_motor_collection()
+            async for document in collection.find({"time": {"$lte": until}}):
+                try:
+                    task = Cron.model_validate(document)
+                except ValidationError as e:
+                    await self._dead_letter_invalid(document, e)
+                    continue
+                self._push(task)
+        except BaseException:
+            # The tasks within the horizon were not all loaded, so load again
+            self.loaded_until = previous
+            raise
+
+    async def _dead_letter_invalid(
+        self,
+        document: dict,
+        error: ValidationError,
+    ) -> None:
+        logger.error(f"Invalid CRON task {document.get('_id')}: {error}")
+        try:
+            dead = CronDeadLetter(
+                type=str(document.get("type")),
+                time=document.get("time"),
+                user=document.get("user"),
+                tag=str(document.get("tag")),
+                attempts=document.get("attempts", 0),
+                last_error=f"Invalid CRON task: {error}"[:1000],
+                failed_at=discord.utils.utcnow(),
+            )
+            await dead.insert()
+            await Cron.get_motor_collection().delete_one({"_id": document["_id"]})
+        except Exception:
+            # Left in place; it is skipped again on every load
+            logger.exception(
+                f"Could not dead-letter invalid CRON task {document.get('_id')}",
+            )
+            return
+
+        if self.invalid_handler is not None:
+            try:
+                await self.invalid_handler(dead)
+            except Exception:
+                logger.exception(f"Error while handling invalid CRON task {dead.id}")
+
+    async def _run(self) -> None:
+        while True:
+            self._wake.clear()
+            now = discord.utils.utcnow()
+
+            if self.loaded_until is None or now >= self.loaded_until:
+                try:
+                    await self.load()
+                except Exception:
+                    logger.exception("Could not load CRON tasks; retrying shortly.")
+                    await asyncio.sleep(self.retry_delay)
+                    continue
+            assert self.loaded_until is not None
+
+            # Execute every task which is due
+            while self.heap and self.heap[0][0] <= now:
+                _, _, task = heapq.heappop(self.heap)
+                self.scheduled.discard(task.id)
+                await self._execute(task)
+
+            deadline = self.loaded_until
+            if self.heap and self.heap[0][0] < deadline:
+                deadline = self.heap[0][0]
+            delay = (deadline - discord.utils.utcnow()).total_seconds()
+            if delay > 0:
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._wake.wait(), timeout=delay)
+
+    async def _execute(self, task: Cron) -> None:
+        try:
+            # The task may have been removed since it was loaded, such as by
+            # staff or by a member removing their selfmute early
+            current = await Cron.get(task.id)
+            if current is None:
+                return
+            await self.handler(current)
+        except Exception:
+            logger.exception(f"Error while executing CRON task {task.id}")
+
+    async def retry_later(self, task: Cron, error: Exception) -> bool:
+        """
+        Records a failed attempt of a task and schedules its next attempt with
+        exponential backoff.
+
+        Returns:
+            False if the task has failed too many times and should be given up on,
+            in which case it is not rescheduled.
+        """
+        attempts = task.attempts + 1
+        last_error = f"{type(error).__name__}: {error}"
+        if attempts >= self.max_attempts:
+            task.attempts = attempts
+            task.last_error = last_error
+            return False
+
+        next_attempt = discord.utils.utcnow() + self.base_delay * 2 ** (attempts - 1)
+        await task.update(
+            Set(
+                {
+                    Cron.attempts: attempts,
+                    Cron.next_attempt: next_attempt,
+                    Cron.last_error: last_error,
+                },
+            ),
+        )
+        task.attempts = attempts
+        task.next_attempt = next_attempt
+        task.last_error = last_error
+        self.add(task)
+        return True
+
+    async def dead_letter(self, task: Cron) -> CronDeadLetter:
+        """
+        Moves a task which will no longer be retried to the dead-letter
+        collection.
+        """
+        dead = CronDeadLetter(
+            type=task.cron_type,
+            time=task.time,
+            user=task.user,
+            tag=task.tag,
+            attempts=task.attempts,
+            last_error=task.last_error,
+            failed_at=discord.utils.utcnow(),
+        )
+        await dead.insert()
+        await task.delete()
+        return dead
@@ -111,6 +111,61 @@ class DevCommands(commands.Cog):
             "Well, hello there. Welcome to version 5!",
         )
 
+    @app_commands.command(
+        description="Shows the latency of each stage of the message pipeline.",
+    )
+    @app_commands.guilds(*env.slash_command_guilds)
+    @app_commands.check(is_in_bot_spam)
+    async def pipelinestats(self, interaction: discord.Interaction):
+        """
+        Shows how many messages each stage of the message pipeline has processed,
+        and the median, 95th percentile and maximum latency of its recent runs.
+        """
+        pipeline = self.bot.pipeline
+        lines = []
+        for name, (priority, _) in sorted(
+            pipeline.stages.items(),
+            key=lambda item: item[1][0],
+        ):
+            latency = pipeline.latencies[name]
+            lines.append(
+                f"`{name}` (priority {priority}): {latency.count} messages, {latency.errors} errors, "
+                f"p50 {latency.percentile(0.5) * 1000:.1f} ms, "
+                f"p95 {latency.percentile(0.95) * 1000:.1f} ms, "
+                f"max {max(latency.samples, default=0) * 1000:.1f} ms",
+            )
+        await interaction.response.send_message(
+            "\n".join(lines) or "No stages are registered.",
+        )
+
+    @app_commands.command(
+        description="Shows how long each extension took to load at startup.",
+    )
+    @app_commands.guilds(*env.slash_command_guilds)
+    @app_commands.check(is_in_bot_spam)
+    async def startupstats(self, interaction: discord.Interaction):
+        """
+        Shows how long loading each extension took at startup, split between
+        importing its module and setting up its cogs, along with the modules
+        which were imported lazily since.
+        """
+        startup = self.bot.startup
+        lines = [f"Extensions loaded in {startup.total * 1000:.0f} ms:"]
+        for timing in sorted(startup.timings, key=lambda t: t.total, reverse=True):
+            lines.append(
+                f"`{timing.name}`: {timing.total * 1000:.0f} ms "
+                f"(import {timing.imports * 1000:.0f} ms, "
+                f"setup {timing.setup * 1000:.0f} ms)"
+                + (" **failed**" if timing.failed else ""),
+            )
+        if startup.lazy_imports:
+            lines.append("Imported on first use:")
+            lines.extend(
+                f"`{name}`: {seconds * 1000:.0f} ms"
+                for name, seconds in startup.lazy_imports.items()
+            )
+        await interaction.response.send_message("\n".join(lines))
+
 
 async def setup(bot: PiBot):
     await bot.add_cog(DevCommands(bot))
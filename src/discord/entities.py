@@ -0,0 +1,257 @@
+"""
+Holds the registry which resolves the channel, role and category names from
+src.discord.globals to the corresponding objects of a guild.
+"""
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING
+
+import discord
+from discord.ext import commands
+
+import src.discord.globals
+from src.discord.globals import ROLE_STAFF, ROLE_VIP
+
+if TYPE_CHECKING:
+    from bot import PiBot
+
+
+logger = logging.getLogger(__name__)
+
+
+def _constants(prefix: str) -> frozenset[str]:
+    return frozenset(
+        value
+        for key, value in vars(src.discord.globals).items()
+        if key.startswith(prefix) and isinstance(value, str)
+    )
+
+
+# The names Pi-Bot refers to, taken from the constants in src.discord.globals
+CHANNEL_NAMES = _constants("CHANNEL_")
+ROLE_NAMES = _constants("ROLE_")
+CATEGORY_NAMES = _constants("CATEGORY_")
+# Members with any of these roles are staff
+STAFF_ROLE_NAMES = (ROLE_STAFF, ROLE_VIP)
+
+
+class GuildEntities:
+    """
+    The ids of the known channels, roles and categories of a single guild.
+    """
+
+    __slots__ = ("channels", "roles", "categories", "staff_role_ids")
+
+    # Name -> id
+    channels: dict[str, int]
+    roles: dict[str, int]
+    categories: dict[str, int]
+    staff_role_ids: frozenset[int]
+
+    def __init__(self, guild: discord.Guild):
+        # Like discord.utils.get, the first entity with a matching name wins
+        self.channels = {}
+        for channel in guild.text_channels:
+            if channel.name in CHANNEL_NAMES:
+                self.channels.setdefault(channel.name, channel.id)
+        self.roles = {}
+        for role in guild.roles:
+            if role.name in ROLE_NAMES:
+                self.roles.setdefault(role.name, role.id)
+        self.categories = {}
+        for category in guild.categories:
+            if category.name in CATEGORY_NAMES:
+                self.categories.setdefault(category.name, category.id)
+        self.staff_role_ids = frozenset(
+            self.roles[name] for name in STAFF_ROLE_NAMES if name in self.roles
+        )
+
+
+class EntityRegistry(commands.Cog):
+    """
+    Resolves the channels, roles and categories Pi-Bot refers to by name.
+
+    The first lookup in a guild scans its channels and roles once and stores the
+    id of every entity named in src.discord.globals, after which lookups are
+    dictionary accesses. A guild's ids are discarded whenever one of its
+    channels or roles is created, deleted or renamed, and rebuilt on the next
+    lookup.
+
+    While loaded, the registry is available as `bot.entities`. Extensions are
+    loaded into their own module objects, so the class cannot be used to find
+    the cog; use the module-level helpers below, which fall back to scanning the
+    guild by name when the registry is not loaded.
+    """
+
+    entities: dict[int, GuildEntities]
+
+    def __init__(self, bot: PiBot):
+        self.bot = bot
+        self.entities = {}
+
+    async def cog_load(self) -> None:
+        self.bot.entities = self
+
+    async def cog_unload(self) -> None:
+        if self.bot.entities is self:
+            self.bot.entities = None
+
+    def resolve(self, guild: discord.Guild) -> GuildEntities:
+        """
+        Returns the ids of the known entities of a guild, scanning the guild if
+        they are not known yet.
+        """
+        entities = self.entities.get(guild.id)
+        if entities is None:
+            entities = GuildEntities(guild)
+            self.entities[guild.id] = entities
+        return entities
+
+    def invalidate(self, guild: discord.Guild) -> None:
+        """
+        Discards the ids of a guild's entities, so that they are resolved again
+        on the next lookup.
+        """
+        self.entities.pop(guild.id, None)
+
+    def channel(self, guild: discord.Guild, name: str) -> discord.TextChannel | None:
+        """
+        Returns the text channel with the given name, if it exists.
+        """
+        channel_id = self.resolve(guild).channels.get(name)
+        if channel_id is None:
+            return None
+        channel = guild.get_channel(channel_id)
+        return channel if isinstance(channel, discord.TextChannel) else None
+
+    def role(self, guild: discord.Guild, name: str) -> discord.Role | None:
+        """
+        Returns the role with the given name, if it exists.
+        """
+        role_id = self.resolve(guild).roles.get(name)
+        return guild.get_role(role_id) if role_id is not None else None
+
+    def category(
+        self,
+        guild: discord.Guild,
+        name: str,
+    ) -> discord.CategoryChannel | None:
+        """
+        Returns the category with the given name, if it exists.
+        """
+        category_id = self.resolve(guild).categories.get(name)
+        if category_id is None:
+            return None
+        category = guild.get_channel(category_id)
+        return category if isinstance(category, discord.CategoryChannel) else None
+
+    def is_channel(self, channel: discord.abc.GuildChannel, name: str) -> bool:
+        """
+        Returns whether a channel is the text channel with the given name.
+        """
+        return self.resolve(channel.guild).channels.get(name) == channel.id
+
+    def is_staff(self, member: discord.Member) -> bool:
+        """
+        Returns whether a member has the staff or VIP role.
+        """
+        return any(
+            member.get_role(role_id) is not None
+            for role_id in self.resolve(member.guild).staff_role_ids
+        )
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel: discord.abc.GuildChannel):
+        self.invalidate(channel.guild)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        self.invalidate(channel.guild)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_update(
+        self,
+        before: discord.abc.GuildChannel,
+        after: discord.abc.GuildChannel,
+    ):
+        # Moving a channel can change which of two same-named channels comes first
+        if before.name != after.name or before.position != after.position:
+            self.invalidate(after.guild)
+
+    @commands.Cog.listener()
+    async def on_guild_role_create(self, role: discord.Role):
+        self.invalidate(role.guild)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role):
+        self.invalidate(role.guild)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        if before.name != after.name or before.position != after.position:
+            self.invalidate(after.guild)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        self.invalidate(guild)
+
+
+def _registry(client: discord.Client) -> EntityRegistry | None:
+    return getattr(client, "entities", None)
+
+
+def resolve_channel(
+    client: discord.Client,
+    guild: discord.Guild,
+    name: str,
+) -> discord.TextChannel | None:
+    """
+    Returns the text channel of a guild with the given name, if it exists.
+    """
+    registry = _registry(client)
+    if registry is not None:
+        return registry.channel(guild, name)
+    return discord.utils.get(guild.text_channels, name=name)
+
+
+def resolve_role(
+    client: discord.Client,
+    guild: discord.Guild,
+    name: str,
+) -> discord.Role | None:
+    """
+    Returns the role of a guild with the given name, if it exists.
+    """
+    registry = _registry(client)
+    if registry is not None:
+        return registry.role(guild, name)
+    return discord.utils.get(guild.roles, name=name)
+
+
+def is_named_channel(
+    client: discord.Client,
+    channel: discord.abc.GuildChannel,
+    name: str,
+) -> bool:
+    """
+    Returns whether a channel is the text channel with the given name.
+    """
+    registry = _registry(client)
+    if registry is not None:
+        return registry.is_channel(channel, name)
+    return channel == discord.utils.get(channel.guild.text_channels, name=name)
+
+
+def is_staff(client: discord.Client, member: discord.Member) -> bool:
+    """
+    Returns whether a member has the staff or VIP role.
+    """
+    registry = _registry(client)
+    if registry is not None:
+        return registry.is_staff(member)
+    return any(role.name in STAFF_ROLE_NAMES for role in member.roles)
+
+
+async def setup(bot: PiBot):
+    await bot.add_cog(EntityRegistry(bot))
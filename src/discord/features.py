@@ -0,0 +1,107 @@
+"""
+Holds the per-message features shared by the cogs which inspect every message
+sent in the server, such as the censor, spam and ping systems.
+"""
+from __future__ import annotations
+
+import hashlib
+import re
+import unicodedata
+from collections import OrderedDict
+from typing import TYPE_CHECKING, ClassVar
+
+if TYPE_CHECKING:
+    import discord
+
+URL_PATTERN = re.compile(r"https?://\S+", re.IGNORECASE)
+INVITE_PATTERN = re.compile(r"discord\.gg|discord\.com/invite", re.IGNORECASE)
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+class MessageFeatures:
+    """
+    Features of a message's content which are computed once and then shared by
+    every cog processing the message, so each message is only normalized,
+    tokenized and character-counted a single time.
+
+    Use MessageFeatures.for_message to get the (memoized) features of a message.
+    """
+
+    __slots__ = (
+        "content",
+        "lowered",
+        "text",
+        "tokens",
+        "upper_count",
+        "lower_count",
+        "url_spans",
+        "invite_spans",
+        "fingerprint",
+    )
+
+    # The original, unmodified content
+    content: str
+    # The original content, lowercased; pings are matched against this, not text
+    lowered: str
+    # The content, Unicode-normalized (NFKC) and casefolded
+    text: str
+    # The set of words found in text
+    tokens: frozenset[str]
+    # The number of uppercase and lowercase characters in the original content
+    upper_count: int
+    lower_count: int
+    # The (start, end) spans of URLs and Discord invite links in the original content
+    url_spans: tuple[tuple[int, int], ...]
+    invite_spans: tuple[tuple[int, int], ...]
+    # A digest of text, used to compare content without storing it
+    fingerprint: bytes
+
+    _cache: ClassVar[OrderedDict[int, MessageFeatures]] = OrderedDict()
+    _cache_size = 512
+
+    def __init__(self, content: str):
+        self.content = content
+        self.lowered = content.lower()
+        self.text = unicodedata.normalize("NFKC", content).casefold()
+        self.tokens = frozenset(TOKEN_PATTERN.findall(self.text))
+
+        upper_count = lower_count = 0
+        for char in content:
+            if char.isupper():
+                upper_count += 1
+            elif char.islower():
+                lower_count += 1
+        self.upper_count = upper_count
+        self.lower_count = lower_count
+
+        self.url_spans = tuple(m.span() for m in URL_PATTERN.finditer(content))
+        self.invite_spans = tuple(m.span() for m in INVITE_PATTERN.finditer(content))
+        self.fingerprint = hashlib.blake2b(
+            self.text.strip().encode(),
+            digest_size=16,
+        ).digest()
+
+    @classmethod
+    def for_message(cls, message: discord.Message) -> MessageFeatures:
+        """
+        Returns the features of a message, computing them only if they have not
+        been computed for the message's current content yet.
+        """
+        features = cls._cache.get(message.id)
+        if features is not None and features.content == message.content:
+            cls._cache.move_to_end(message.id)
+            return features
+
+        features = cls(message.content)
+        cls._cache[message.id] = features
+        if len(cls._cache) > cls._cache_size:
+            cls._cache.popitem(last=False)
+        return features
+
+    @property
+    def has_caps(self) -> bool:
+        """
+        Whether the content has caps (more capitalized letters than lowercase
+        letters, with some leeway).
+        """
+        return self.upper_count > (self.lower_count + 3)
@@ -3,7 +3,7 @@ Holds global variables shared between cogs and variables that are initialized wh
 the bot is first setup.
 """
 
-from src.mongo.models import Censor, Event, Invitational, Ping, Tag
+from src.mongo.models import Censor, Event, Invitational, Tag
 
 ##############
 # CONSTANTS
@@ -126,7 +126,6 @@ CENSOR: Censor = {}
 # FIXME: CENSOR for now has to be a dummy value since Beanie does
 # not get initialized at the global scope before importing globals.py
 EVENT_INFO: list[Event] = []
-PING_INFO: list[Ping] = []
 INVITATIONAL_INFO: list[Invitational] = []
 TAGS: list[Tag] = []
 CURRENT_WIKI_PAGE = None
@@ -0,0 +1,179 @@
+"""
+Configures the bot's logging.
+
+Records are handed to a queue on the event loop thread and written to the
+console and to the log file by a background thread, so slow disk or terminal
+I/O never blocks the event loop. The log file holds one compact JSON object
+per line. The high-volume message and edit logs are sampled and rate capped.
+"""
+from __future__ import annotations
+
+import datetime
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import time
+
+from rich.logging import RichHandler
+
+# Loggers for the per-message logs, which can produce many records per second
+MESSAGE_LOGGER = "pibot.messages"
+EDIT_LOGGER = "pibot.edits"
+
+KB = 1024
+MB = 1024 * KB
+
+# The attributes every LogRecord has, which are not included as extra fields
+_RECORD_ATTRIBUTES = frozenset(
+    logging.LogRecord("", 0, "", 0, "", None, None).__dict__,
+) | {"message", "asctime", "taskName"}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats records as compact, single-line JSON objects.
+
+    Every record includes its time, level, logger and message, along with its
+    traceback if it has one and any fields passed through `extra`.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.datetime.fromtimestamp(
+                record.created,
+                tz=datetime.timezone.utc,
+            ).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(
+            entry,
+            ensure_ascii=False,
+            default=str,
+            separators=(",", ":"),
+        )
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a random sample of a logger's records, and at most a set number of
+    records per second.
+
+    Warnings and errors always pass. Records are dropped before their message is
+    formatted, and the next record which passes carries the number of records
+    dropped before it in its `dropped` field.
+    """
+
+    def __init__(self, sample_rate: float = 1.0, rate: float = 20, burst: float = 100):
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.dropped = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            self.dropped += 1
+            return False
+
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            self.dropped += 1
+            return False
+        self.tokens -= 1
+
+        if self.dropped:
+            record.dropped = self.dropped
+            self.dropped = 0
+        return True
+
+
+class _LocalQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queues records for a listener running in the same process.
+
+    Only the message is merged on the calling thread, as its arguments may be
+    changed after the call; the traceback is kept as-is, so that the console
+    can still render it richly.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+# The sampling applied to each high-volume logger
+SAMPLED_LOGGERS = {
+    MESSAGE_LOGGER: {"sample_rate": 1.0, "rate": 20, "burst": 100},
+    EDIT_LOGGER: {"sample_rate": 1.0, "rate": 10, "burst": 50},
+}
+
+
+def setup_logging(
+    dev_mode: bool,
+    filename: str = "pibot.log",
+) -> logging.handlers.QueueListener:
+    """
+    Routes every log record through a queue to the console and the log file,
+    which are written to from a background thread.
+
+    Args:
+        dev_mode (bool): Whether to log debug records and rich tracebacks to the
+            console.
+        filename (str): The file to write JSON log lines to.
+
+    Returns:
+        logging.handlers.QueueListener: The started listener, which should be
+        stopped on shutdown to flush any remaining records.
+    """
+    file_handler = logging.handlers.RotatingFileHandler(
+        filename=filename,
+        encoding="utf-8",
+        maxBytes=32 * MB,
+        backupCount=5,
+    )
+    file_handler.setFormatter(JsonFormatter())
+    console_handler = RichHandler(
+        level=logging.DEBUG if dev_mode else logging.INFO,
+        rich_tracebacks=dev_mode,
+    )
+
+    log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(
+        log_queue,
+        file_handler,
+        console_handler,
+        respect_handler_level=True,
+    )
+
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(_LocalQueueHandler(log_queue))
+
+    for name, options in SAMPLED_LOGGERS.items():
+        logging.getLogger(name).addFilter(SamplingFilter(**options))
+
+    listener.start()
+    return listener
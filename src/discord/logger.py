@@ -13,6 +13,7 @@ from discord.ext import commands
 
 from commanderrors import CommandNotAllowedInChannel
 from env import env
+from src.discord.entities import resolve_channel, resolve_role
 from src.discord.globals import (
     CHANNEL_DELETEDM,
     CHANNEL_DMLOG,
@@ -49,7 +50,7 @@ class Logger(commands.Cog):
         guild = self.bot.get_guild(env.server_id)
         assert isinstance(guild, discord.Guild)
 
-        dm_channel = discord.utils.get(guild.text_channels, name=CHANNEL_DMLOG)
+        dm_channel = resolve_channel(self.bot, guild, CHANNEL_DMLOG)
         assert isinstance(dm_channel, discord.TextChannel)
 
         # Create an embed containing the direct message info and send it to the log channel
@@ -93,10 +94,7 @@ class Logger(commands.Cog):
         """
         # Send fun alert message on every 100 members who join
         member_count = len(member.guild.members)
-        lounge_channel = discord.utils.get(
-            member.guild.text_channels,
-            name=CHANNEL_LOUNGE,
-        )
+        lounge_channel = resolve_channel(self.bot, member.guild, CHANNEL_LOUNGE)
         assert isinstance(lounge_channel, discord.TextChannel)
 
         if member_count % 100 == 0:
@@ -114,11 +112,8 @@ class Logger(commands.Cog):
             member (discord.Member): The member who left the server.
         """
         # Post a leaving info message
-        leave_channel = discord.utils.get(
-            member.guild.text_channels,
-            name=CHANNEL_LEAVE,
-        )
-        unconfirmed_role = discord.utils.get(member.guild.roles, name=ROLE_UC)
+        leave_channel = resolve_channel(self.bot, member.guild, CHANNEL_LEAVE)
+        unconfirmed_role = resolve_role(self.bot, member.guild, ROLE_UC)
         assert isinstance(leave_channel, discord.TextChannel)
         assert isinstance(unconfirmed_role, discord.Role)
 
@@ -146,10 +141,7 @@ class Logger(commands.Cog):
         await leave_channel.send(embed=embed)
 
         # Delete any messages the user left in the welcoming channel
-        welcome_channel = discord.utils.get(
-            member.guild.text_channels,
-            name=CHANNEL_WELCOME,
-        )
+        welcome_channel = resolve_channel(self.bot, member.guild, CHANNEL_WELCOME)
         assert isinstance(welcome_channel, discord.TextChannel)
         async for message in welcome_channel.history():
             if not message.pinned and (
@@ -344,10 +336,7 @@ class Logger(commands.Cog):
         )
         if not guild:
             guild = await self.bot.fetch_guild(env.server_id)
-        edited_channel = discord.utils.get(
-            guild.text_channels,
-            name=CHANNEL_EDITEDM,
-        )
+        edited_channel = resolve_channel(self.bot, guild, CHANNEL_EDITEDM)
 
         # Ignore payloads for events in logging channels (which would cause recursion)
         if not isinstance(channel, discord.abc.PrivateChannel) and channel.name in [
@@ -521,10 +510,7 @@ class Logger(commands.Cog):
             if channel.type == discord.ChannelType.private
             else channel.guild
         )
-        deleted_channel: discord.TextChannel = discord.utils.get(
-            guild.text_channels,
-            name=CHANNEL_DELETEDM,
-        )
+        deleted_channel = resolve_channel(self.bot, guild, CHANNEL_DELETEDM)
 
         # Do not send a log for messages deleted out of the deleted messages
         # channel (could cause a possible bot recursion)
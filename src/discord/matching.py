@@ -0,0 +1,176 @@
+"""
+Holds the compiled matchers used to scan user content against staff-maintained
+lists, such as the censor, and the worker pool they are executed on.
+
+Patterns are compiled with the third-party `regex` engine rather than `re`
+because it can abort a match once a time budget runs out.
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from typing import TypeVar
+
+import regex
+
+logger = logging.getLogger(__name__)
+T = TypeVar("T")
+
+CENSOR_REPLACEMENT = "<censored>"
+
+
+class MatchPoolFullError(Exception):
+    """
+    Raised when the match worker pool has too many pending matches to accept
+    another one within its queue timeout.
+    """
+
+
+class MatchWorkerPool:
+    """
+    A bounded pool of worker threads dedicated to running matchers against user
+    content, kept separate from the default executor used by asyncio.to_thread.
+
+    Every match is given a hard time budget which is enforced by the regex engine
+    itself: a runaway pattern raises TimeoutError and its worker is immediately
+    free again, rather than silently holding on to a thread. When every worker is
+    busy and the queue is full, callers wait for a free slot (backpressure) and
+    MatchPoolFullError is raised if none frees up in time.
+    """
+
+    timeout: float
+    queue_timeout: float
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        max_queued: int = 32,
+        timeout: float = 1.5,
+        queue_timeout: float = 3,
+    ):
+        self.timeout = timeout
+        self.queue_timeout = queue_timeout
+        self._slots = asyncio.Semaphore(max_workers + max_queued)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="match-worker",
+        )
+
+    async def run(self, func: Callable[..., T], *args) -> T:
+        """
+        Runs a matcher method on the pool. The method must accept a `timeout`
+        keyword argument, which is set to the pool's time budget.
+
+        Raises:
+            TimeoutError: The match exceeded its time budget and was aborted.
+            MatchPoolFullError: No slot in the pool freed up in time.
+        """
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise MatchPoolFullError from None
+
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor,
+                functools.partial(func, *args, timeout=self.timeout),
+            )
+        finally:
+            self._slots.release()
+
+    def shutdown(self) -> None:
+        """
+        Stops the pool's workers. Pending matches are cancelled.
+        """
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class CensorMatcher:
+    """
+    Compiles every censored word and emoji into a single alternation so that
+    detection and replacement each take one pass over the text, no matter how
+    many entries the censor list contains.
+
+    Words are wrapped in word boundaries, like the censor has always done;
+    emojis are matched anywhere in the text. Entries that are not valid regular
+    expressions are skipped (and logged) rather than breaking the whole censor.
+    """
+
+    version: int
+    pattern: regex.Pattern | None
+
+    def __init__(self):
+        self.version = 0
+        self.pattern = None
+
+    def rebuild(self, words: Iterable[str], emojis: Iterable[str]) -> None:
+        """
+        Recompiles the matcher from the given censor lists. This should only be
+        called when the censor list changes.
+
+        Args:
+            words: The censored words, each of which may be a regular expression.
+            emojis: The censored emojis.
+        """
+        alternatives = [
+            rf"\b(?:{word})\b" for word in words if self._is_valid(word, "word")
+        ]
+        alternatives.extend(
+            f"(?:{emoji})" for emoji in emojis if self._is_valid(emoji, "emoji")
+        )
+
+        self.pattern = (
+            regex.compile("|".join(alternatives), regex.IGNORECASE)
+            if alternatives
+            else None
+        )
+        self.version += 1
+        logger.debug(
+            f"Rebuilt censor matcher (version {self.version}) with "
+            f"{len(alternatives)} entries.",
+        )
+
+    def _is_valid(self, entry: str, kind: str) -> bool:
+        try:
+            regex.compile(entry)
+        except regex.error as e:
+            logger.warning(f"Skipping censored {kind} with invalid pattern: {e}")
+            return False
+        return True
+
+    def search(self, content: str, timeout: float | None = None) -> bool:
+        """
+        Returns whether the content contains anything on the censor list.
+
+        Raises:
+            TimeoutError: The match took longer than timeout seconds.
+        """
+        return (
+            self.pattern is not None
+            and self.pattern.search(content, concurrent=True, timeout=timeout)
+            is not None
+        )
+
+    def censor(self, content: str, timeout: float | None = None) -> tuple[str, int]:
+        """
+        Replaces every censored word and emoji in the content in a single pass.
+
+        Raises:
+            TimeoutError: The match took longer than timeout seconds.
+
+        Returns:
+            A tuple of the censored content and the number of replacements made.
+            A count of zero means the content did not need to be censored.
+        """
+        if self.pattern is None:
+            return content, 0
+        return self.pattern.subn(
+            CENSOR_REPLACEMENT,
+            content,
+            concurrent=True,
+            timeout=timeout,
+        )
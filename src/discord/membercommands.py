@@ -7,10 +7,10 @@ from __future__ import annotations
 import datetime
 import random
 import re
+from types import ModuleType
 from typing import TYPE_CHECKING, Literal
 
 import discord
-import wikipedia as wikip
 from aioify import aioify
 from discord import app_commands
 from discord.ext import commands
@@ -28,13 +28,12 @@ from src.discord.globals import (
     RULES,
 )
 from src.discord.views import YesNo
-from src.mongo.models import Cron
-from src.wiki.wiki import implement_command
 
 if TYPE_CHECKING:
     from bot import PiBot
 
     from .reporter import Reporter
+    from .tasks import CronTasks
 
 
 class MemberCommands(commands.Cog):
@@ -47,7 +46,18 @@ class MemberCommands(commands.Cog):
 
     def __init__(self, bot: PiBot):
         self.bot = bot
-        self.aiowikip = aioify(obj=wikip)
+        # Wikipedia is only imported the first time it is used
+        self.aiowikip = None
+
+    async def load_wikipedia(self) -> ModuleType:
+        """
+        Imports the wikipedia module, and wraps it for asynchronous use the first
+        time it is loaded.
+        """
+        wikip = await self.bot.startup.import_module("wikipedia")
+        if self.aiowikip is None:
+            self.aiowikip = aioify(obj=wikip)
+        return wikip
 
     @app_commands.command(description="Looking for help? Try this!")
     @app_commands.guilds(*env.slash_command_guilds)
@@ -306,12 +316,8 @@ class MemberCommands(commands.Cog):
                     name=CHANNEL_UNSELFMUTE,
                 )
                 await member.add_roles(role)
-                await Cron(
-                    type="UNSELFMUTE",
-                    user=member.id,
-                    time=times[mute_length],
-                    tag=str(member),
-                ).insert()
+                cron_cog: commands.Cog | CronTasks = self.bot.get_cog("CronTasks")
+                await cron_cog.schedule_unselfmute(member, times[mute_length])
                 return await interaction.edit_original_response(
                     content=f"You have been muted. You may use the button in the {unselfmute_channel.mention} channel to unmute.",
                     embed=None,
@@ -695,7 +701,8 @@ class MemberCommands(commands.Cog):
                 sent by Discord.
             page (str): The name of the page to request the summary of.
         """
-        command = await implement_command("summary", page)
+        wiki = await self.bot.startup.wiki()
+        command = await wiki.implement_command("summary", page)
         if not command:
             await interaction.response.send_message(
                 f"Unfortunately, the `{page}` page does not exist.",
@@ -722,7 +729,8 @@ class MemberCommands(commands.Cog):
                 sent by Discord.
             term (str): The term to search with.
         """
-        command = await implement_command("search", term)
+        wiki = await self.bot.startup.wiki()
+        command = await wiki.implement_command("search", term)
         if len(command):
             await interaction.response.send_message(
                 "\n".join([f"`{search}`" for search in command]),
@@ -748,7 +756,8 @@ class MemberCommands(commands.Cog):
                 sent by Discord.
             page (str): The name of the page to get the link of.
         """
-        command = await implement_command("link", page)
+        wiki = await self.bot.startup.wiki()
+        command = await wiki.implement_command("link", page)
         if not command:
             await interaction.response.send_message(
                 f"The `{page}` page does not yet exist.",
@@ -787,6 +796,7 @@ class MemberCommands(commands.Cog):
             command (str): The command to execute across Wikipedia.
             request (str): The request associated with the command.
         """
+        wikip = await self.load_wikipedia()
         if command == "search":
             return await interaction.response.send_message(
                 "\n".join(
@@ -0,0 +1,116 @@
+"""
+Holds the daily counters of members joining and leaving the server.
+"""
+from __future__ import annotations
+
+import datetime
+
+import discord
+from pymongo.errors import DuplicateKeyError
+
+from src.mongo.models import MemberCountDay
+
+
+def utc_day(moment: datetime.datetime) -> datetime.datetime:
+    """
+    Returns the UTC midnight starting the day of a moment.
+    """
+    return moment.astimezone(datetime.timezone.utc).replace(
+        hour=0,
+        minute=0,
+        second=0,
+        microsecond=0,
+    )
+
+
+class MemberCounter:
+    """
+    Counts the members joining and leaving the server today.
+
+    The counters are updated as members join and leave, and reset when the first
+    event of a new UTC day arrives. Every update is also applied to the day's
+    document in the member_counts collection with an atomic, upserting
+    increment, so the collection holds a daily time series of the server's
+    growth and the counters survive restarts.
+    """
+
+    day: datetime.datetime
+    joins: int
+    leaves: int
+
+    def __init__(self):
+        self.day = utc_day(discord.utils.utcnow())
+        self.joins = 0
+        self.leaves = 0
+
+    async def load(self) -> None:
+        """
+        Restores today's counters from the database.
+        """
+        self.day = utc_day(discord.utils.utcnow())
+        today = await MemberCountDay.find_one(MemberCountDay.day == self.day)
+        self.joins = today.joins if today else 0
+        self.leaves = today.leaves if today else 0
+
+    def _roll_over(self) -> None:
+        day = utc_day(discord.utils.utcnow())
+        if day != self.day:
+            self.day = day
+            self.joins = 0
+            self.leaves = 0
+
+    @property
+    def today(self) -> tuple[int, int]:
+        """
+        The number of members who joined and left today, as (joins, leaves).
+        """
+        self._roll_over()
+        return self.joins, self.leaves
+
+    async def record_join(self, member_count: int) -> None:
+        """
+        Counts a member joining the server.
+        """
+        self._roll_over()
+        self.joins += 1
+        await self._persist(member_count, joins=1)
+
+    async def record_leave(self, member_count: int) -> None:
+        """
+        Counts a member leaving the server.
+        """
+        self._roll_over()
+        self.leaves += 1
+        await self._persist(member_count, leaves=1)
+
+    async def _persist(
+        self,
+        member_count: int,
+        joins: int = 0,
+        leaves: int = 0,
+    ) -> None:
+        # A single upserting update, so that two events arriving at the start of
+        # a day cannot both insert the day's document
+        update = {
+            "$inc": {"joins": joins, "leaves": leaves},
+            "$set": {"member_count": member_count},
+        }
+        collection = MemberCountDay.get_motor_collection()
+        try:
+            await collection.update_one({"day": self.day}, update, upsert=True)
+        except DuplicateKeyError:
+            # Another upsert inserted the document first; it exists now
+            await collection.update_one({"day": self.day}, update)
+
+    @staticmethod
+    async def history(days: int) -> list[MemberCountDay]:
+        """
+        Returns the counters of the most recent days with any activity, oldest
+        first.
+        """
+        since = utc_day(discord.utils.utcnow()) - datetime.timedelta(days=days - 1)
+        return (
+            await MemberCountDay.find(MemberCountDay.day >= since)
+            .sort(+MemberCountDay.day)
+            .to_list()
+        )
@@ -0,0 +1,127 @@
+"""
+Holds the coordinator which deduplicates automatic moderation actions, so that
+one burst of spam results in a single action and a single staff report.
+"""
+from __future__ import annotations
+
+import asyncio
+import collections
+import logging
+import time
+from collections.abc import Awaitable, Callable
+
+import discord
+
+logger = logging.getLogger(__name__)
+
+
+class ModerationAction:
+    """
+    An automatic action taken against a member, along with every reason it was
+    triggered for while it was active.
+    """
+
+    __slots__ = ("member", "action", "reasons", "channel", "jump_url", "taken_at")
+
+    member: discord.Member
+    action: str
+    reasons: list[str]
+    # Where the action was first triggered
+    channel: discord.abc.Messageable
+    # A link to the message announcing the action, if one was sent
+    jump_url: str | None
+    taken_at: float
+
+    def __init__(
+        self,
+        member: discord.Member,
+        action: str,
+        reason: str,
+        channel: discord.abc.Messageable,
+    ):
+        self.member = member
+        self.action = action
+        self.reasons = [reason]
+        self.channel = channel
+        self.jump_url = None
+        self.taken_at = time.monotonic()
+
+
+class ModerationCoordinator:
+    """
+    Deduplicates automatic moderation actions per (member, action).
+
+    The first trigger of an action claims it, and only the claimant performs the
+    action. Further triggers of the same action against the same member within
+    the window (such as the caps and repetition checks firing on the same
+    message, or every following message of a spam burst) only add their reason,
+    if new, to the claimed action. The staff report for an action is sent once,
+    shortly after the action, so reasons which arrive in the meantime are merged
+    into it.
+    """
+
+    actions: collections.OrderedDict[tuple[int, str], ModerationAction]
+
+    def __init__(self, window_seconds: float = 300, report_delay: float = 3):
+        self.window_seconds = window_seconds
+        self.report_delay = report_delay
+        self.actions = collections.OrderedDict()
+        self._report_tasks: set[asyncio.Task] = set()
+
+    def claim(
+        self,
+        member: discord.Member,
+        action: str,
+        reason: str,
+        channel: discord.abc.Messageable,
+    ) -> ModerationAction | None:
+        """
+        Claims an action against a member.
+
+        Returns:
+            The new action if the caller should perform it, or None if the same
+            action was already taken against the member within the window.
+        """
+        now = time.monotonic()
+        while self.actions:
+            oldest = next(iter(self.actions.values()))
+            if now - oldest.taken_at < self.window_seconds:
+                break
+            self.actions.popitem(last=False)
+
+        key = (member.id, action)
+        existing = self.actions.get(key)
+        if existing is not None:
+            if reason not in existing.reasons:
+                existing.reasons.append(reason)
+            return None
+
+        claimed = ModerationAction(member, action, reason, channel)
+        self.actions[key] = claimed
+        return claimed
+
+    def report_later(
+        self,
+        action: ModerationAction,
+        report: Callable[[ModerationAction], Awaitable[None]],
+    ) -> None:
+        """
+        Sends the staff report of an action after a short delay, so that every
+        reason the action was triggered for is included in a single report.
+        """
+        task = asyncio.create_task(self._report(action, report))
+        self._report_tasks.add(task)
+        task.add_done_callback(self._report_tasks.discard)
+
+    async def _report(
+        self,
+        action: ModerationAction,
+        report: Callable[[ModerationAction], Awaitable[None]],
+    ) -> None:
+        await asyncio.sleep(self.report_delay)
+        try:
+            await report(action)
+        except Exception:
+            logger.exception(
+                f"Could not report {action.action} of member {action.member.id}",
+            )
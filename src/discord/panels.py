@@ -0,0 +1,177 @@
+"""
+Holds the registry of panels: messages owned by Pi-Bot which it keeps up to
+date, such as the welcome and un-self-mute messages.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+from typing import TYPE_CHECKING, Any
+
+import discord
+
+from src.mongo.models import Panel
+
+if TYPE_CHECKING:
+    from bot import PiBot
+
+
+logger = logging.getLogger(__name__)
+
+
+class PanelManager:
+    """
+    Keeps panels up to date without re-reading channel history.
+
+    The registry stores, for each panel, the channel and message it lives in
+    along with a hash of the content it was last rendered with. Ensuring a panel
+    whose rendered content did not change therefore makes no API calls. The
+    panel is only edited when the hash changes, and only re-created when the
+    edit finds the message deleted (or a deletion event is received for it).
+    The first time a panel is ensured without a registry entry, Pi-Bot's last
+    message in the channel is adopted as the panel, if there is one.
+    """
+
+    panels: dict[str, Panel] | None
+
+    def __init__(self, bot: PiBot):
+        self.bot = bot
+        self.panels = None
+        self._lock = asyncio.Lock()
+        # Panels whose view has been attached during this session
+        self._attached: set[str] = set()
+
+    @staticmethod
+    def render_hash(**kwargs: Any) -> str:
+        """
+        Hashes the content, embed and view a panel is rendered with.
+        """
+        rendered = {
+            "content": kwargs.get("content"),
+            "embed": kwargs["embed"].to_dict() if "embed" in kwargs else None,
+            "view": kwargs["view"].to_components() if "view" in kwargs else None,
+        }
+        return hashlib.blake2b(
+            json.dumps(rendered, sort_keys=True, default=str).encode(),
+            digest_size=16,
+        ).hexdigest()
+
+    async def _load(self) -> dict[str, Panel]:
+        if self.panels is None:
+            self.panels = {
+                panel.name: panel for panel in await Panel.find_all().to_list()
+            }
+        return self.panels
+
+    async def _adopt(self, channel: discord.TextChannel) -> discord.Message | None:
+        # Only used when the registry has no entry for the panel yet
+        async for message in channel.history(limit=1):
+            if message.author == self.bot.user:
+                return message
+        return None
+
+    async def ensure(
+        self,
+        name: str,
+        channel: discord.TextChannel,
+        create: bool = True,
+        **kwargs: Any,
+    ) -> None:
+        """
+        Makes sure a panel exists in a channel with the given content.
+
+        Args:
+            name: The name of the panel in the registry.
+            channel: The channel the panel lives in.
+            create: Whether to send the panel if it does not exist. If False, an
+                existing message of Pi-Bot is only adopted and kept up to date.
+            **kwargs: The content, embed and/or view of the panel, as passed to
+                discord.abc.Messageable.send.
+        """
+        async with self._lock:
+            panels = await self._load()
+            digest = self.render_hash(**kwargs)
+            panel = panels.get(name)
+
+            if panel is not None and panel.channel_id == channel.id:
+                if panel.content_hash == digest:
+                    self._attach(name, panel, kwargs.get("view"))
+                    return
+                try:
+                    await channel.get_partial_message(panel.message_id).edit(**kwargs)
+                except discord.NotFound:
+                    panel = await self._create(name, channel, create, kwargs)
+            else:
+                message = await self._adopt(channel)
+                if message is not None:
+                    await message.edit(**kwargs)
+                    panel = self._record(name, panel, channel, message)
+                else:
+                    panel = await self._create(name, channel, create, kwargs)
+
+            if panel is None:
+                return
+            panel.content_hash = digest
+            await panel.save()
+            # Sending or editing a message with a view attaches the view
+            self._attached.add(name)
+
+    def _attach(self, name: str, panel: Panel, view: discord.ui.View | None) -> None:
+        # Make the panel's buttons work after a restart without editing it
+        if name in self._attached:
+            return
+        if view is not None and view.is_persistent():
+            self.bot.add_view(view, message_id=panel.message_id)
+        self._attached.add(name)
+
+    def _record(
+        self,
+        name: str,
+        panel: Panel | None,
+        channel: discord.TextChannel,
+        message: discord.Message,
+    ) -> Panel:
+        if panel is None:
+            panel = Panel(
+                name=name,
+                channel_id=channel.id,
+                message_id=message.id,
+                content_hash="",
+            )
+            assert self.panels is not None
+            self.panels[name] = panel
+        panel.channel_id = channel.id
+        panel.message_id = message.id
+        return panel
+
+    async def _create(
+        self,
+        name: str,
+        channel: discord.TextChannel,
+        create: bool,
+        kwargs: dict[str, Any],
+    ) -> Panel | None:
+        assert self.panels is not None
+        if not create:
+            panel = self.panels.pop(name, None)
+            if panel is not None:
+                await panel.delete()
+            return None
+        message = await channel.send(**kwargs)
+        return self._record(name, self.panels.get(name), channel, message)
+
+    async def forget(self, message_id: int) -> None:
+        """
+        Drops the registry entry of a panel whose message was deleted, so it is
+        re-created the next time it is ensured.
+        """
+        if not self.panels:
+            return
+        for name, panel in list(self.panels.items()):
+            if panel.message_id == message_id:
+                del self.panels[name]
+                self._attached.discard(name)
+                await panel.delete()
+                logger.info(f"Panel {name} was deleted and will be re-created.")
@@ -4,10 +4,7 @@ Holds functionality for members to manage their ping subscriptions.
 
 from __future__ import annotations
 
-import asyncio
 import collections
-import contextlib
-import datetime
 import logging
 import re
 from typing import TYPE_CHECKING
@@ -17,13 +14,20 @@ from discord import app_commands
 from discord.app_commands import AppCommandContext
 from discord.ext import commands
 
-import src.discord.globals
 from commandchecks import is_in_dms
+from src.discord.entities import is_named_channel
+from src.discord.features import MessageFeatures
 from src.discord.globals import CHANNEL_BOTSPAM
+from src.discord.matching import MatchPoolFullError, MatchWorkerPool
+from src.discord.pingbreadth import PingBreadthAnalyzer
+from src.discord.pingdispatch import PingAlert, PingDispatcher, RecentMessageBuffer
+from src.discord.pingindex import PingIndex, PingRejectedError, PingStore, compile_ping
+from src.discord.visibility import ChannelVisibilityCache
 from src.mongo.models import Ping
 
 if TYPE_CHECKING:
     from bot import PiBot
+    from src.discord.reporter import Reporter
 
 
 logger = logging.getLogger(__name__)
@@ -48,77 +52,174 @@ class PingManager(commands.Cog):
         ),
     )
 
-    recent_messages: dict[int, collections.deque[discord.Message]]
+    recent_messages: RecentMessageBuffer
+    store: PingStore
+    visibility: ChannelVisibilityCache
+    dispatcher: PingDispatcher
+    # Runs regular expression pings, giving each pattern a small time budget
+    pool: MatchWorkerPool
+    breadth: PingBreadthAnalyzer
 
     def __init__(self, bot: PiBot):
         self.bot = bot
-        self.recent_messages = {}
+        self.recent_messages = RecentMessageBuffer()
+        self.store = PingStore()
+        self.visibility = ChannelVisibilityCache()
+        self.dispatcher = PingDispatcher(bot, self.send_ping_pm)
+        self.pool = MatchWorkerPool(timeout=0.05)
+        self.breadth = PingBreadthAnalyzer()
+
+    async def cog_load(self) -> None:
+        self.dispatcher.start()
+        # Independent of the spam checks, so both run concurrently after the censor
+        self.bot.pipeline.register("ping", 20, self.on_message)
+
+    async def cog_unload(self) -> None:
+        self.bot.pipeline.unregister("ping")
+        self.dispatcher.stop()
+        self.pool.shutdown()
+
+    async def reload_pings(self) -> None:
+        """
+        Reloads every member's pings from the database and rebuilds the ping index.
+        """
+        self.store.load(await Ping.find_all().to_list())
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
+    async def on_message(
+        self,
+        message: discord.Message,
+        features: MessageFeatures,
+    ) -> None:
         """
-        Event listening for new messages in an attempt to send out needed pings.
+        Message pipeline stage which sends out needed pings for new messages.
 
         Args:
             message (discord.Message): The message that was just sent by a user.
+            features (MessageFeatures): The precomputed features of the message.
         """
         # Do not ping for messages in a private channel or messages from bots
         if (message.channel.type == discord.ChannelType.private) or message.author.bot:
             return
 
         # Do not ping if the message is coming from the botspam channel
-        botspam_channel = discord.utils.get(
-            message.guild.text_channels,
-            name=CHANNEL_BOTSPAM,
-        )
-        if message.channel == botspam_channel:
+        if is_named_channel(self.bot, message.channel, CHANNEL_BOTSPAM):
             return
 
         # Store the message to generate recent message history
-        self.recent_messages.setdefault(
-            message.channel.id,
-            collections.deque(maxlen=5),
-        ).append(message)
+        self.recent_messages.append(message)
 
         # Send a ping alert to the relevant users
-        ids = [m.id for m in message.channel.members]
-        for user_pings in src.discord.globals.PING_INFO:
-            # Give up event loop to other coroutines in case ping list is long
-            await asyncio.sleep(0)
+        self.breadth.record(features)
+        matches = await self.match(features)
+        if not matches:
+            return
+
+        # Snapshot the conversation once for every member being alerted
+        context = self.recent_messages.get(message.channel.id)
 
+        mentioned_ids = {m.id for m in message.mentions}
+        for user_id, ping_count in matches.items():
             # Do not ping if:
             #   User was author of message.
             #   User was mentioned in the message.
             #   User cannot see the channel.
-            #   User has DND enabled.
-            user_is_mentioned = user_pings.user_id in [m.id for m in message.mentions]
-            user_can_see_channel = user_pings.user_id in ids
-            user_in_dnd = user_pings.dnd
             if (
-                user_pings.user_id == message.author.id
-                or user_is_mentioned
-                or (not user_can_see_channel or user_in_dnd)
+                user_id == message.author.id
+                or user_id in mentioned_ids
+                or not self.visibility.can_see(message.channel, user_id)
             ):
                 continue
 
-            # Count the number of pings in the message
-            ping_count = 0
-            pings = [rf"\b({ping})\b" for ping in user_pings.word_pings]
-            for ping in pings:
-                try:
-                    if len(re.findall(ping, message.content, re.I)):
-                        ping_count += 1
-                except Exception as e:
-                    logger.error(
-                        f"Could not evaluate message content with ping {ping} of user {user_pings.user_id}: {e!s}",
-                    )
-
-            if ping_count:
-                user_obj = self.bot.get_user(user_pings.user_id)
-                if user_obj:
-                    # Do not throw exception if the user has direct messages disabled
-                    with contextlib.suppress(discord.Forbidden):
-                        await self.send_ping_pm(user_obj, message, ping_count)
+            self.dispatcher.enqueue(PingAlert(user_id, message, ping_count, context))
+
+    async def match(self, features: MessageFeatures) -> collections.Counter[int]:
+        """
+        Finds the members whose pings are matched by a message. Members in
+        do-not-disturb mode are never returned.
+
+        Regular expression pings are matched on the worker pool, and any which
+        exceed their time budget are quarantined and reported to staff.
+        """
+        index = self.store.index
+        matches = index.match_literals(features)
+
+        snapshot = index.regex_snapshot()
+        if snapshot:
+            try:
+                regex_matches, timed_out = await self.pool.run(
+                    PingIndex.match_regexes,
+                    snapshot,
+                    features.content,
+                )
+            except MatchPoolFullError:
+                logger.warning(
+                    "Ping match pool is full; skipped regular expression pings.",
+                )
+            else:
+                matches.update(regex_matches)
+                for user_id, ping in timed_out:
+                    await self.quarantine(user_id, ping, features.content)
+
+        return index.without_dnd(matches)
+
+    async def quarantine(self, user_id: int, ping: str, content: str) -> None:
+        """
+        Stops matching a ping which exceeded its time budget and reports it.
+        """
+        if (user_id, ping) in self.store.index.quarantined:
+            return
+        logger.warning(
+            f"Quarantining ping {ping} of user {user_id} after it timed out.",
+        )
+        self.store.index.quarantine(user_id, ping)
+
+        reporter_cog: commands.Cog | Reporter = self.bot.get_cog("Reporter")
+        await reporter_cog.create_ping_quarantine_report(user_id, ping, content)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_update(
+        self,
+        before: discord.abc.GuildChannel,
+        after: discord.abc.GuildChannel,
+    ):
+        """
+        Invalidates the cached visibility of a channel whose permission overwrites
+        changed.
+        """
+        if before.overwrites != after.overwrites:
+            self.visibility.invalidate_channel(after.id)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        self.visibility.invalidate_channel(channel.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        """
+        Invalidates all cached channel visibility when a role's permissions change.
+        """
+        if before.permissions != after.permissions:
+            self.visibility.clear()
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, _: discord.Role):
+        self.visibility.clear()
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member: discord.Member):
+        self.visibility.update_member(member)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: discord.Member):
+        self.visibility.remove_member(member)
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before: discord.Member, after: discord.Member):
+        """
+        Updates the cached channel visibility of a member whose roles changed.
+        """
+        if before.roles != after.roles:
+            self.visibility.update_member(after)
 
     def format_text(
         self,
@@ -138,19 +239,19 @@ class PingManager(commands.Cog):
                 with respect to. This is used to get relevant ping info about the
                 specific user.
         """
-        user_ping_obj = next(
-            user_obj
-            for user_obj in src.discord.globals.PING_INFO
-            if user_obj.user_id == user.id
-        )
+        user_ping_obj = self.store.get(user.id)
 
-        pings = [rf"\b({ping})\b" for ping in user_ping_obj.word_pings]
+        # The user may have removed their pings since the alert was queued
+        word_pings = user_ping_obj.word_pings if user_ping_obj else []
 
-        for expression in pings:
+        for ping in word_pings:
+            if (user.id, ping) in self.store.index.quarantined:
+                continue
             try:
-                text = re.sub(rf"{expression}", r"**\1**", text, flags=re.I)
-            except Exception as e:
-                logger.warn(f"Could not bold ping due to unfavored RegEx. Error: {e}")
+                pattern = compile_ping(ping)
+                text = pattern.sub(r"**\1**", text, timeout=self.pool.timeout)
+            except (PingRejectedError, TimeoutError) as e:
+                logger.warning(f"Could not bold ping {ping}: {e}")
 
         # Prevent the text from being too long
         if len(text) > length:
@@ -158,64 +259,50 @@ class PingManager(commands.Cog):
         else:
             return text
 
-    def expire_recent_messages(self) -> None:
-        """
-        Remove all recent messages older than a specified amount of time.
-
-        Currently, this is called whenever a ping PM is sent.
-        """
-        for _, messages in self.recent_messages.items():
-            for message in messages.copy():
-                if (discord.utils.utcnow() - message.created_at) > datetime.timedelta(
-                    hours=3,
-                ):
-                    messages.remove(message)
-
     async def send_ping_pm(
         self,
         user: discord.User,
-        message: discord.Message,
-        ping_count: int,
+        alerts: list[PingAlert],
     ) -> None:
         """
-        Sends a direct message to the user about a message containing a relevant ping expression.
+        Sends a direct message to the user about messages containing relevant ping
+        expressions. Several alerts are merged into a single digest.
 
         Args:
             user (discord.User): The user to send a DM to.
-            message (discord.Message): The message which triggered the ping.
-            ping_count (int): How many pings were triggered by the specific message.
+            alerts (list[PingAlert]): The alerts to send, oldest first.
         """
-        # Expire recent messages
-        self.expire_recent_messages()
-
         # Create the alert embed
+        ping_count = sum(alert.ping_count for alert in alerts)
         description = ""
         if ping_count == 1:
             description = "**One of your pings was mentioned by a user in the Scioly.org Discord server!**"
         elif ping_count > 1:
             description = "**Several of your pings were mentioned by a user in the Scioly.org Discord server!**"
 
-        description = (
-            description
-            + "\n\n"
-            + "\n".join(
+        for i, alert in enumerate(alerts):
+            section = "\n".join(
                 [
-                    f"{message.author.mention}: {self.format_text(message.content, 100, user)}"
-                    for message in self.recent_messages[message.channel.id]
+                    f"{recent.author_mention}: {self.format_text(recent.content, 100, user)}"
+                    for recent in alert.context
                 ],
             )
-        )
-        description = (
-            description
-            + "\n\n"
-            + f"Come check out the conversation! [Click here]({message.jump_url}) to be teleported to the message!"
-        )
+            section += (
+                "\n\n"
+                + f"Come check out the conversation! [Click here]({alert.message.jump_url}) to be teleported to the message!"
+            )
+            # Keep the digest within the embed description limit
+            if len(description) + len(section) > 3900:
+                description += f"\n\n_... and {len(alerts) - i} more alerts._"
+                break
+            description += "\n\n" + section
+
         embed = discord.Embed(
             title=":bellhop: Ping Alert!",
             color=discord.Color.brand_red(),
             description=description,
         )
-        embed.set_thumbnail(url=message.author.display_avatar.url)
+        embed.set_thumbnail(url=alerts[-1].message.author.display_avatar.url)
 
         embed.set_footer(
             text="If you don't want this ping anymore, use /ping remove in the Scioly.org Discord server!",
@@ -243,21 +330,16 @@ class PingManager(commands.Cog):
                 ephemeral=True,
             )
 
-        user = [
-            u for u in src.discord.globals.PING_INFO if u.user_id == interaction.user.id
-        ]
+        user = self.store.get(interaction.user.id)
 
-        if len(user):
-            user = user[0]
+        if user:
             if user.dnd:
-                user.dnd = False
-                await user.save()
+                await self.store.set_dnd(user.user_id, False)
                 return await interaction.response.send_message(
                     "Disabled DND mode for pings.",
                 )
             else:
-                user.dnd = True
-                await user.save()
+                await self.store.set_dnd(user.user_id, True)
                 return await interaction.response.send_message(
                     "Enabled DND mode for pings.",
                 )
@@ -291,47 +373,70 @@ class PingManager(commands.Cog):
                 ephemeral=True,
             )
 
+        # Matching the ping against recent messages can take a while, especially
+        # when the match pool is busy
+        await interaction.response.defer()
+
+        try:
+            pattern = compile_ping(word)
+        except PingRejectedError as e:
+            return await interaction.followup.send(
+                f"Ignoring adding the `{word}` ping because {e}.",
+            )
+
         member = interaction.user
-        user = next(
-            (u for u in src.discord.globals.PING_INFO if u.user_id == member.id),
-            None,
-        )
+        user = self.store.get(member.id)
         if user:
-            # User already has an object in the PING_INFO dictionary
+            # User already has a ping document
             pings = user.word_pings
-            try:
-                re.findall(word, "test phrase")
-            except Exception:
-                return await interaction.response.send_message(
-                    f"Ignoring adding the `{word}` ping because it uses illegal characters.",
-                )
             if f"({word})" in pings or f"\\b({word})\\b" in pings or word in pings:
-                return await interaction.response.send_message(
+                return await interaction.followup.send(
                     f"Ignoring adding the `{word}` ping because you already have a ping currently set as that.",
                 )
-            else:
-                logger.debug(f"adding word: {re.escape(word)}")
-                # relevant_doc = next(
-                #     doc
-                #     for doc in src.discord.globals.PING_INFO
-                #     if doc.user_id == member.id
-                # )
-                # relevant_doc.word_pings.append(word)
-                user.word_pings.append(word)
-                await user.save()
-        else:
-            # User does not already have an object in the PING_INFO dictionary
-            new_user_ping_entry = Ping(user_id=member.id, word_pings=[word], dnd=False)
-            src.discord.globals.PING_INFO.append(new_user_ping_entry)
-            await new_user_ping_entry.save()
+            logger.debug(f"adding word: {re.escape(word)}")
+
+        # Measure how often the ping would have fired on recent messages
+        hit_rate = 0.0
+        sample = self.breadth.snapshot()
+        if sample is not None:
+            try:
+                hit_rate = await self.pool.run(
+                    PingBreadthAnalyzer.hit_rate,
+                    sample,
+                    pattern,
+                )
+            except TimeoutError:
+                return await interaction.followup.send(
+                    f"Ignoring adding the `{word}` ping because it takes too long to match.",
+                )
+            except MatchPoolFullError:
+                return await interaction.followup.send(
+                    "Pi-Bot is busy right now, please try adding your ping again in a moment.",
+                )
+        if hit_rate > self.breadth.reject_rate:
+            return await interaction.followup.send(
+                f"Ignoring adding the `{word}` ping because it would have matched {hit_rate:.0%} of recent "
+                "messages. Please use a more specific ping.",
+            )
+
+        # Creates the user's ping document if they do not have one yet
+        await self.store.add(member.id, word)
         small_ping_message = ""
-        if len(word) < 4:  # FIXME: Magic number
+        if hit_rate > self.breadth.warn_rate:
+            small_ping_message = (
+                f"\n\n**This ping would have matched {hit_rate:.0%} of recent messages. Please be "
+                'responsible with the pinging feature. Using pings senselessly (such as pinging for "the" or "a") may '
+                "result in you being temporarily disallowed from using or receiving pings.**"
+            )
+        elif sample is None and len(word) < self.breadth.short_ping_length:
+            # Too few messages were sampled to measure the ping, so fall back to
+            # flagging short pings
             small_ping_message = (
                 "\n\n**Please be "
                 'responsible with the pinging feature. Using pings senselessly (such as pinging for "the" or "a") may '
                 "result in you being temporarily disallowed from using or receiving pings.**"
             )
-        return await interaction.response.send_message(
+        return await interaction.followup.send(
             f"Great! You will now receive an alert for messages that contain the `{word}` word.{small_ping_message}",
         )
 
@@ -360,40 +465,45 @@ class PingManager(commands.Cog):
             )
 
         member = interaction.user
-        user = next(
-            (u for u in src.discord.globals.PING_INFO if u.user_id == member.id),
-            None,
-        )
+        user = self.store.get(member.id)
 
         if not user or not user.word_pings:
             return await interaction.response.send_message(
                 f"Since you have no pings, `{test}` matched `0` pings.",
             )
 
-        # FIXME: Reimplement test and on_message to use same ping detection function
-        word_pings = [
-            {"new": rf"\b({ping})\b", "original": ping} for ping in user.word_pings
-        ]
-        user_pings = word_pings
-        matched = False
-        response = ""
+        # Each ping may wait for the match pool, so the reply can be late
+        await interaction.response.defer()
 
-        for ping in user_pings:
-            if isinstance(ping, dict):
-                if len(re.findall(ping["new"], test, re.I)) > 0:
-                    response += f"Your ping `{ping['original']}` matches `{test}`.\n"
-                    matched = True
-            else:
-                if len(re.findall(ping, test, re.I)) > 0:
-                    response += f"Your ping `{ping}` matches `{test}`.\n"
-                    matched = True
+        # Match with the same compiled patterns and time budget as on_message
+        features = MessageFeatures(test)
+        snapshot = []
+        for ping in user.word_pings:
+            if (member.id, ping) in self.store.index.quarantined:
+                continue
+            try:
+                snapshot.append((member.id, ping, compile_ping(ping)))
+            except PingRejectedError:
+                continue
 
-        if not matched:
-            return await interaction.response.send_message(
+        response = ""
+        for _, ping, pattern in snapshot:
+            try:
+                matched = await self.pool.run(pattern.search, features.content)
+            except (TimeoutError, MatchPoolFullError):
+                response += (
+                    f"Your ping `{ping}` took too long to check against `{test}`.\n"
+                )
+                continue
+            if matched:
+                response += f"Your ping `{ping}` matches `{test}`.\n"
+
+        if not response:
+            return await interaction.followup.send(
                 f"`{test}` matched `0` pings.",
             )
         else:
-            return await interaction.response.send_message(response)
+            return await interaction.followup.send(response)
 
     @ping_group.command(
         name="list",
@@ -418,10 +528,7 @@ class PingManager(commands.Cog):
             )
 
         member = interaction.user
-        user = next(
-            (u for u in src.discord.globals.PING_INFO if u.user_id == member.id),
-            None,
-        )
+        user = self.store.get(member.id)
 
         # User has no pings
         if user is None or len(user.word_pings) == 0:
@@ -463,10 +570,7 @@ class PingManager(commands.Cog):
 
         # Get the user's info
         member = interaction.user
-        user = next(
-            (u for u in src.discord.globals.PING_INFO if u.user_id == member.id),
-            None,
-        )
+        user = self.store.get(member.id)
 
         # The user has no pings
         if user is None or len(user.word_pings) == 0:
@@ -476,32 +580,28 @@ class PingManager(commands.Cog):
 
         # Remove all of user's pings
         if word == "all":
-            user.word_pings.clear()
-            await user.save()
+            await self.store.clear(user.user_id)
             return await interaction.response.send_message(
                 "I removed all of your pings.",
             )
 
         # Attempt to remove a word ping
         if word in user.word_pings:
-            user.word_pings.remove(word)
-            await user.save()
+            await self.store.remove(user.user_id, word)
             return await interaction.response.send_message(
                 f"I removed the `{word}` ping you were referencing.",
             )
 
         # Attempt to remove a word ping with extra formatting
         elif f"\\b({word})\\b" in user.word_pings:
-            user.word_pings.remove(f"\\b({word})\\b")
-            await user.save()
+            await self.store.remove(user.user_id, f"\\b({word})\\b")
             return await interaction.response.send_message(
                 f"I removed the `{word}` ping you were referencing.",
             )
 
         # Attempt to remove a word ping with alternate extra formatting
         elif f"({word})" in user.word_pings:
-            user.word_pings.remove(f"({word})")
-            await user.save()
+            await self.store.remove(user.user_id, f"({word})")
             return await interaction.response.send_message(
                 f"I removed the `{word}` RegEx ping you were referencing.",
             )
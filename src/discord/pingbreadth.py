@@ -0,0 +1,95 @@
+"""
+Holds the analyzer which estimates how often a new ping would fire, based on a
+rolling sample of recent messages sent in the server.
+"""
+from __future__ import annotations
+
+import collections
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import regex
+
+    from src.discord.features import MessageFeatures
+
+
+class PingBreadthAnalyzer:
+    """
+    Keeps a rolling sample of the content of recent messages and measures
+    the share of them that a ping matches, so over-broad pings (which would send
+    an alert for a large part of all messages) can be refused before they are
+    added.
+
+    Each sampled message is searched separately, so a pattern can never match
+    across the boundary between two messages. Until enough messages have been
+    sampled (such as right after a restart), pings shorter than
+    short_ping_length are flagged instead.
+    """
+
+    sample: collections.deque[str]
+
+    def __init__(
+        self,
+        sample_size: int = 2000,
+        min_sample: int = 200,
+        warn_rate: float = 0.01,
+        reject_rate: float = 0.05,
+        short_ping_length: int = 4,
+    ):
+        self.sample = collections.deque(maxlen=sample_size)
+        self.min_sample = min_sample
+        self.warn_rate = warn_rate
+        self.reject_rate = reject_rate
+        self.short_ping_length = short_ping_length
+
+    def record(self, features: MessageFeatures) -> None:
+        """
+        Adds a message to the sample, evicting the oldest sampled message if the
+        sample is full.
+        """
+        if features.content.strip():
+            self.sample.append(features.content)
+
+    def snapshot(self) -> tuple[str, ...] | None:
+        """
+        Returns a copy of the sample which is safe to measure from a worker
+        thread, or None if too few messages have been sampled yet for the
+        measurement to mean anything.
+        """
+        if len(self.sample) < self.min_sample:
+            return None
+        return tuple(self.sample)
+
+    @staticmethod
+    def hit_rate(
+        texts: tuple[str, ...],
+        pattern: regex.Pattern,
+        timeout: float | None = None,
+    ) -> float:
+        """
+        Measures the share of sampled messages which a ping's pattern matches.
+        Meant to be run on a worker.
+
+        Args:
+            texts: A snapshot of the sample.
+            pattern: The compiled ping.
+            timeout: The time budget for measuring the whole sample.
+
+        Returns:
+            The share of messages matched, between 0 and 1.
+
+        Raises:
+            TimeoutError: The pattern exceeded its time budget.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        hits = 0
+        for text in texts:
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError("Ping breadth measurement timed out")
+            if pattern.search(text, concurrent=True, timeout=remaining) is not None:
+                hits += 1
+        return hits / len(texts)
@@ -0,0 +1,236 @@
+"""
+Holds the background dispatcher which delivers ping alerts to members through
+direct messages.
+"""
+from __future__ import annotations
+
+import asyncio
+import collections
+import datetime
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import discord
+
+if TYPE_CHECKING:
+    from bot import PiBot
+
+
+logger = logging.getLogger(__name__)
+
+
+class RecentMessage:
+    """
+    A compact snapshot of a recently sent message, used as conversation context
+    in ping alerts.
+    """
+
+    __slots__ = ("author_id", "author_mention", "content", "created_at")
+
+    author_id: int
+    author_mention: str
+    content: str
+    created_at: datetime.datetime
+
+    # Longer content is cut off, since alerts only show the start of each message
+    max_content_length = 200
+
+    def __init__(self, message: discord.Message):
+        self.author_id = message.author.id
+        self.author_mention = message.author.mention
+        self.content = message.content[: self.max_content_length]
+        self.created_at = message.created_at
+
+
+class RecentMessageBuffer:
+    """
+    Keeps the last few messages of each channel as compact snapshots.
+
+    Each channel has a small ring buffer, and only the most recently active
+    channels are kept, so memory stays bounded regardless of how many channels
+    are active. Snapshots older than max_age are expired lazily whenever a
+    channel's buffer is read, rather than by sweeping every channel.
+    """
+
+    channels: collections.OrderedDict[int, collections.deque[RecentMessage]]
+
+    def __init__(
+        self,
+        per_channel: int = 5,
+        max_channels: int = 500,
+        max_age: datetime.timedelta = datetime.timedelta(hours=3),
+    ):
+        self.per_channel = per_channel
+        self.max_channels = max_channels
+        self.max_age = max_age
+        self.channels = collections.OrderedDict()
+
+    def append(self, message: discord.Message) -> None:
+        """
+        Stores a snapshot of a message in its channel's buffer.
+        """
+        buffer = self.channels.get(message.channel.id)
+        if buffer is None:
+            buffer = collections.deque(maxlen=self.per_channel)
+            self.channels[message.channel.id] = buffer
+            if len(self.channels) > self.max_channels:
+                self.channels.popitem(last=False)
+        else:
+            self.channels.move_to_end(message.channel.id)
+        buffer.append(RecentMessage(message))
+
+    def get(self, channel_id: int) -> list[RecentMessage]:
+        """
+        Returns the unexpired snapshots of a channel, oldest first.
+        """
+        buffer = self.channels.get(channel_id)
+        if buffer is None:
+            return []
+        cutoff = discord.utils.utcnow() - self.max_age
+        while buffer and buffer[0].created_at < cutoff:
+            buffer.popleft()
+        return list(buffer)
+
+
+@dataclass
+class PingAlert:
+    """
+    A single message which matched one or more of a member's pings.
+    """
+
+    user_id: int
+    message: discord.Message
+    ping_count: int
+    # The recent messages in the channel at the time of the alert, oldest first
+    context: list[RecentMessage]
+
+
+class PingDispatcher:
+    """
+    Delivers ping alerts from a background queue so that sending direct messages
+    never holds up message processing.
+
+    Alerts for the same member which arrive within a short window are merged and
+    delivered as a single digest. Deliveries run with bounded concurrency and are
+    paced to stay within Discord's rate limits for opening and sending to DM
+    channels. Members whose direct messages are closed (or who blocked Pi-Bot)
+    are remembered for a while, and alerts to them are dropped right away.
+    """
+
+    # Alerts waiting for their member's coalescing window to end
+    pending: dict[int, list[PingAlert]]
+    # Maps members whose direct messages failed to when they failed
+    undeliverable: dict[int, datetime.datetime]
+
+    def __init__(
+        self,
+        bot: PiBot,
+        deliver: Callable[[discord.User, list[PingAlert]], Awaitable[None]],
+        concurrency: int = 4,
+        coalesce_seconds: float = 5,
+        max_queued: int = 1000,
+        sends_per_second: float = 5,
+        undeliverable_for: datetime.timedelta = datetime.timedelta(days=1),
+    ):
+        self.bot = bot
+        self.deliver = deliver
+        self.concurrency = concurrency
+        self.coalesce_seconds = coalesce_seconds
+        self.send_interval = 1 / sends_per_second
+        self.undeliverable_for = undeliverable_for
+        self.pending = {}
+        self.undeliverable = {}
+        self._queue: asyncio.Queue[int] = asyncio.Queue(maxsize=max_queued)
+        self._workers: list[asyncio.Task] = []
+        self._pace_lock = asyncio.Lock()
+        self._next_send = 0.0
+
+    def start(self) -> None:
+        """
+        Starts the background workers.
+        """
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"ping-dispatch-{i}")
+            for i in range(self.concurrency)
+        ]
+
+    def stop(self) -> None:
+        """
+        Stops the background workers. Undelivered alerts are dropped.
+        """
+        for worker in self._workers:
+            worker.cancel()
+        self._workers = []
+
+    def is_undeliverable(self, user_id: int) -> bool:
+        """
+        Returns whether direct messages to the member recently failed.
+        """
+        failed_at = self.undeliverable.get(user_id)
+        if failed_at is None:
+            return False
+        if discord.utils.utcnow() - failed_at > self.undeliverable_for:
+            del self.undeliverable[user_id]
+            return False
+        return True
+
+    def enqueue(self, alert: PingAlert) -> None:
+        """
+        Schedules an alert for delivery. If the member already has alerts waiting,
+        the alert is merged into their digest.
+        """
+        if self.is_undeliverable(alert.user_id):
+            return
+
+        alerts = self.pending.get(alert.user_id)
+        if alerts is not None:
+            alerts.append(alert)
+            return
+
+        self.pending[alert.user_id] = [alert]
+        asyncio.get_running_loop().call_later(
+            self.coalesce_seconds,
+            self._release,
+            alert.user_id,
+        )
+
+    def _release(self, user_id: int) -> None:
+        try:
+            self._queue.put_nowait(user_id)
+        except asyncio.QueueFull:
+            dropped = self.pending.pop(user_id, [])
+            logger.warning(
+                f"Ping dispatch queue is full; dropped {len(dropped)} alert(s) for user {user_id}.",
+            )
+
+    async def _pace(self) -> None:
+        # Spaces out sends so that bursts do not run into rate limits
+        async with self._pace_lock:
+            now = time.monotonic()
+            if self._next_send > now:
+                await asyncio.sleep(self._next_send - now)
+            self._next_send = max(now, self._next_send) + self.send_interval
+
+    async def _worker(self) -> None:
+        while True:
+            user_id = await self._queue.get()
+            try:
+                alerts = self.pending.pop(user_id, [])
+                user = self.bot.get_user(user_id)
+                if not alerts or user is None:
+                    continue
+
+                await self._pace()
+                await self.deliver(user, alerts)
+            except discord.Forbidden:
+                # Direct messages are closed, or the user blocked Pi-Bot
+                self.undeliverable[user_id] = discord.utils.utcnow()
+            except discord.HTTPException as e:
+                logger.warning(f"Could not send ping alert to user {user_id}: {e}")
+            except Exception:
+                logger.exception(f"Error while sending ping alert to user {user_id}")
+            finally:
+                self._queue.task_done()
@@ -0,0 +1,443 @@
+"""
+Holds the store of every member's pings and the inverted index used to find
+which members' pings are matched by a message, without scanning every member's
+pings for every message.
+"""
+from __future__ import annotations
+
+import collections
+import logging
+import re
+from collections.abc import Iterable
+from typing import TYPE_CHECKING
+
+import regex
+from beanie.odm.operators.update.array import AddToSet, Pull
+from beanie.odm.operators.update.general import Set
+
+from src.mongo.models import Ping
+
+try:
+    from re import _constants as sre_constants
+    from re import _parser as sre_parse
+except ImportError:  # Python 3.10
+    import sre_constants
+    import sre_parse
+
+if TYPE_CHECKING:
+    from src.discord.features import MessageFeatures
+
+logger = logging.getLogger(__name__)
+
+LITERAL_PATTERN = re.compile(r"\w+(?: \w+)*")
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Wrappers that older versions of the ping system stored around plain words
+LEGACY_WRAPPERS = (("\\b(", ")\\b"), ("(", ")"))
+
+
+def literal_terms(ping: str) -> tuple[str, ...] | None:
+    """
+    Determines whether a ping is a literal word or phrase (rather than a regular
+    expression) and, if so, returns its normalized words.
+
+    Args:
+        ping: The ping as stored in the database.
+
+    Returns:
+        The lowercased words of the ping, or None if the ping is a regular expression.
+    """
+    inner = ping
+    for prefix, suffix in LEGACY_WRAPPERS:
+        if inner.startswith(prefix) and inner.endswith(suffix):
+            inner = inner[len(prefix) : -len(suffix)]
+            break
+
+    # Pings match the original message text case-insensitively, so the words
+    # are only lowercased (not Unicode-normalized) to match the same messages
+    normalized = inner.lower()
+    if LITERAL_PATTERN.fullmatch(normalized):
+        return tuple(normalized.split(" "))
+    return None
+
+
+class PingRejectedError(Exception):
+    """
+    Raised when a ping can not be compiled, either because it is not a valid
+    regular expression or because it could be catastrophically slow to match.
+    """
+
+
+REPEAT_OPCODES = {
+    sre_constants.MAX_REPEAT,
+    sre_constants.MIN_REPEAT,
+    getattr(sre_constants, "POSSESSIVE_REPEAT", sre_constants.MAX_REPEAT),
+}
+
+
+def _has_nested_quantifier(
+    parsed: sre_parse.SubPattern | list,
+    outer_repeat: bool | None = None,
+) -> bool:
+    """
+    Determines whether a parsed regular expression contains a quantified
+    expression inside another quantified expression, where at least one of the
+    two is unbounded, such as (a+)+ or (a*b?)*. These are the usual cause of
+    catastrophic backtracking.
+
+    Args:
+        parsed: The parsed expression to search.
+        outer_repeat: None if not inside a repeat, otherwise whether the innermost
+            enclosing repeat is unbounded.
+    """
+    for op, av in parsed:
+        if op in REPEAT_OPCODES:
+            _, high, body = av
+            if high > 1:
+                unbounded = high == sre_constants.MAXREPEAT
+                if outer_repeat is not None and (outer_repeat or unbounded):
+                    return True
+                if _has_nested_quantifier(body, unbounded or bool(outer_repeat)):
+                    return True
+            elif _has_nested_quantifier(body, outer_repeat):
+                return True
+        elif op == sre_constants.SUBPATTERN:
+            if _has_nested_quantifier(av[-1], outer_repeat):
+                return True
+        elif op == sre_constants.BRANCH:
+            if any(_has_nested_quantifier(b, outer_repeat) for b in av[1]):
+                return True
+        elif op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            if _has_nested_quantifier(av[1], outer_repeat):
+                return True
+        elif op == sre_constants.GROUPREF_EXISTS:
+            branches = [b for b in av[1:] if b is not None]
+            if any(_has_nested_quantifier(b, outer_repeat) for b in branches):
+                return True
+        elif op == getattr(sre_constants, "ATOMIC_GROUP", None):
+            if _has_nested_quantifier(av, outer_repeat):
+                return True
+    return False
+
+
+def compile_ping(ping: str) -> regex.Pattern:
+    """
+    Compiles a ping into the pattern used to match it against messages. Literal
+    pings always compile; regular expressions are rejected if they are invalid
+    or contain nested quantifiers.
+
+    Raises:
+        PingRejectedError: The ping is not allowed.
+    """
+    terms = literal_terms(ping)
+    if terms is not None:
+        return regex.compile(
+            rf"\b({regex.escape(' '.join(terms))})\b",
+            regex.IGNORECASE,
+        )
+
+    try:
+        parsed = sre_parse.parse(ping)
+        pattern = regex.compile(rf"\b({ping})\b", regex.IGNORECASE)
+    except (re.error, regex.error, RecursionError) as e:
+        raise PingRejectedError("it is not a valid regular expression") from e
+    if _has_nested_quantifier(parsed):
+        raise PingRejectedError(
+            "it contains nested repetition, which can be very slow to match",
+        )
+    return pattern
+
+
+class PingIndex:
+    """
+    An inverted index from ping terms to the members subscribed to them.
+
+    Literal pings (whole words or phrases of words separated by single spaces,
+    which is what nearly every ping is) are looked up by hashing the words and
+    word sequences of a message, so matching costs roughly O(message length +
+    matches) regardless of how many members use pings. Pings which are true
+    regular expressions are kept in a separate compiled set, which is matched on
+    a worker thread with a time budget for each pattern (see match_regexes).
+
+    The index is updated incrementally as members add and remove pings or toggle
+    their do-not-disturb mode.
+    """
+
+    # Maps the words of a literal ping to the ids of its subscribers
+    literals: dict[tuple[str, ...], set[int]]
+    # Maps a member's id to their compiled regular expression pings
+    regexes: dict[int, dict[str, regex.Pattern]]
+    dnd: set[int]
+    # Regular expression pings which exceeded their time budget, as (user id, ping)
+    quarantined: set[tuple[int, str]]
+
+    def __init__(self):
+        self.literals = {}
+        self.regexes = {}
+        self.dnd = set()
+        self.quarantined = set()
+        self._phrase_lengths: collections.Counter[int] = collections.Counter()
+        self._regex_snapshot: tuple[tuple[int, str, regex.Pattern], ...] | None = None
+
+    def rebuild(self, pings: Iterable[Ping]) -> None:
+        """
+        Rebuilds the whole index from every member's ping document.
+        """
+        self.literals.clear()
+        self.regexes.clear()
+        self.dnd.clear()
+        self._phrase_lengths.clear()
+        self._regex_snapshot = None
+        for user_pings in pings:
+            for ping in user_pings.word_pings:
+                self.add(user_pings.user_id, ping)
+            self.set_dnd(user_pings.user_id, user_pings.dnd)
+
+    def add(self, user_id: int, ping: str) -> None:
+        """
+        Adds a single ping for a member to the index.
+        """
+        terms = literal_terms(ping)
+        if terms is not None:
+            subscribers = self.literals.setdefault(terms, set())
+            if user_id not in subscribers:
+                subscribers.add(user_id)
+                self._phrase_lengths[len(terms)] += 1
+            return
+
+        if (user_id, ping) in self.quarantined:
+            return
+        try:
+            pattern = compile_ping(ping)
+        except PingRejectedError as e:
+            logger.error(f"Not matching ping {ping} of user {user_id} because {e}")
+            return
+        self.regexes.setdefault(user_id, {})[ping] = pattern
+        self._regex_snapshot = None
+
+    def remove(self, user_id: int, ping: str) -> None:
+        """
+        Removes a single ping of a member from the index.
+        """
+        terms = literal_terms(ping)
+        if terms is not None:
+            subscribers = self.literals.get(terms)
+            if subscribers is not None and user_id in subscribers:
+                subscribers.discard(user_id)
+                self._phrase_lengths[len(terms)] -= 1
+                if not subscribers:
+                    del self.literals[terms]
+            return
+
+        self.quarantined.discard((user_id, ping))
+        user_regexes = self.regexes.get(user_id)
+        if user_regexes is not None:
+            user_regexes.pop(ping, None)
+            if not user_regexes:
+                del self.regexes[user_id]
+            self._regex_snapshot = None
+
+    def quarantine(self, user_id: int, ping: str) -> None:
+        """
+        Stops matching a regular expression ping which exceeded its time budget.
+        The ping stays quarantined (even across rebuilds) until it is removed.
+        """
+        self.remove(user_id, ping)
+        self.quarantined.add((user_id, ping))
+
+    def remove_all(self, user_id: int, pings: Iterable[str]) -> None:
+        """
+        Removes every one of the given pings of a member from the index.
+        """
+        for ping in pings:
+            self.remove(user_id, ping)
+
+    def set_dnd(self, user_id: int, dnd: bool) -> None:
+        """
+        Sets whether a member is in do-not-disturb mode, in which case their
+        pings are never matched.
+        """
+        if dnd:
+            self.dnd.add(user_id)
+        else:
+            self.dnd.discard(user_id)
+
+    def _phrases(self, text: str) -> Iterable[tuple[str, ...]]:
+        """
+        Yields every word and every run of consecutive words (separated by a
+        single space) in the text, up to the length of the longest literal ping.
+        """
+        max_length = max(
+            (length for length, count in self._phrase_lengths.items() if count > 0),
+            default=0,
+        )
+        if max_length == 0:
+            return
+
+        run: list[str] = []
+        previous_end = None
+        for match in TOKEN_PATTERN.finditer(text):
+            if previous_end is None or text[previous_end : match.start()] != " ":
+                run = []
+            run.append(match.group())
+            previous_end = match.end()
+
+            # Yield every phrase ending at this word
+            for length in range(1, min(len(run), max_length) + 1):
+                yield tuple(run[-length:])
+            if len(run) >= max_length:
+                run = run[-(max_length - 1) :] if max_length > 1 else []
+
+    def match_literals(self, features: MessageFeatures) -> collections.Counter[int]:
+        """
+        Finds the members whose literal pings are matched by a message.
+
+        Returns:
+            A counter mapping the ids of matched members to the number of their
+            pings found in the message.
+        """
+        matches: collections.Counter[int] = collections.Counter()
+        seen: set[tuple[str, ...]] = set()
+        for phrase in self._phrases(features.lowered):
+            if phrase in seen:
+                continue
+            seen.add(phrase)
+            subscribers = self.literals.get(phrase)
+            if subscribers:
+                matches.update(subscribers)
+        return matches
+
+    def regex_snapshot(self) -> tuple[tuple[int, str, regex.Pattern], ...]:
+        """
+        Returns an immutable snapshot of every regular expression ping, which is
+        safe to match with from a worker thread while the index keeps changing.
+        """
+        if self._regex_snapshot is None:
+            self._regex_snapshot = tuple(
+                (user_id, ping, pattern)
+                for user_id, patterns in self.regexes.items()
+                for ping, pattern in patterns.items()
+            )
+        return self._regex_snapshot
+
+    @staticmethod
+    def match_regexes(
+        snapshot: tuple[tuple[int, str, regex.Pattern], ...],
+        text: str,
+        timeout: float | None = None,
+    ) -> tuple[collections.Counter[int], list[tuple[int, str]]]:
+        """
+        Matches a snapshot of the regular expression pings against some text,
+        giving each pattern its own time budget. Meant to be run on a worker.
+
+        Returns:
+            A counter mapping the ids of matched members to the number of their
+            pings found in the text, and the (user id, ping) pairs which exceeded
+            their time budget.
+        """
+        matches: collections.Counter[int] = collections.Counter()
+        timed_out: list[tuple[int, str]] = []
+        for user_id, ping, pattern in snapshot:
+            try:
+                if pattern.search(text, concurrent=True, timeout=timeout):
+                    matches[user_id] += 1
+            except TimeoutError:
+                timed_out.append((user_id, ping))
+        return matches, timed_out
+
+    def without_dnd(
+        self,
+        matches: collections.Counter[int],
+    ) -> collections.Counter[int]:
+        """
+        Removes members in do-not-disturb mode from a set of matches.
+        """
+        for user_id in [user_id for user_id in matches if user_id in self.dnd]:
+            del matches[user_id]
+        return matches
+
+
+class PingStore:
+    """
+    Holds every member's ping document, keyed by user id, along with the index
+    used to match them.
+
+    Every write is a small atomic update ($addToSet, $pull or $set) filtered on
+    the indexed user id, rather than a rewrite of the whole document, so
+    concurrent commands can not overwrite each other's changes. Each write also
+    updates the local document and the match index.
+    """
+
+    pings: dict[int, Ping]
+    index: PingIndex
+
+    def __init__(self):
+        self.pings = {}
+        self.index = PingIndex()
+
+    def load(self, pings: Iterable[Ping]) -> None:
+        """
+        Replaces the store's contents with the given ping documents and rebuilds
+        the match index.
+        """
+        self.pings = {user_pings.user_id: user_pings for user_pings in pings}
+        self.index.rebuild(self.pings.values())
+
+    def get(self, user_id: int) -> Ping | None:
+        """
+        Returns the ping document of a member, if they have one.
+        """
+        return self.pings.get(user_id)
+
+    async def add(self, user_id: int, ping: str) -> None:
+        """
+        Adds a ping for a member, creating their ping document if needed.
+        """
+        await Ping.find_one(Ping.user_id == user_id).upsert(
+            AddToSet({Ping.word_pings: ping}),
+            on_insert=Ping(user_id=user_id, word_pings=[ping], dnd=False),
+        )
+
+        user_pings = self.pings.get(user_id)
+        if user_pings is None:
+            self.pings[user_id] = Ping(user_id=user_id, word_pings=[ping], dnd=False)
+        elif ping not in user_pings.word_pings:
+            user_pings.word_pings.append(ping)
+        self.index.add(user_id, ping)
+
+    async def remove(self, user_id: int, ping: str) -> None:
+        """
+        Removes one of a member's pings.
+        """
+        await Ping.find_one(Ping.user_id == user_id).update(
+            Pull({Ping.word_pings: ping}),
+        )
+
+        user_pings = self.pings.get(user_id)
+        if user_pings is not None and ping in user_pings.word_pings:
+            user_pings.word_pings.remove(ping)
+        self.index.remove(user_id, ping)
+
+    async def clear(self, user_id: int) -> None:
+        """
+        Removes all of a member's pings.
+        """
+        await Ping.find_one(Ping.user_id == user_id).update(
+            Set({Ping.word_pings: []}),
+        )
+
+        user_pings = self.pings.get(user_id)
+        if user_pings is not None:
+            self.index.remove_all(user_id, user_pings.word_pings)
+            user_pings.word_pings.clear()
+
+    async def set_dnd(self, user_id: int, dnd: bool) -> None:
+        """
+        Sets whether a member is in do-not-disturb mode.
+        """
+        await Ping.find_one(Ping.user_id == user_id).update(Set({Ping.dnd: dnd}))
+
+        user_pings = self.pings.get(user_id)
+        if user_pings is not None:
+            user_pings.dnd = dnd
+        self.index.set_dnd(user_id, dnd)
@@ -0,0 +1,90 @@
+"""
+Holds the token buckets used to detect members and channels sending messages
+faster than allowed.
+"""
+from __future__ import annotations
+
+import collections
+import time
+from collections.abc import Hashable
+
+
+class TokenBucket:
+    """
+    A bucket holding up to `burst` tokens which refills at a steady rate. Every
+    message takes one token; a message arriving at an empty bucket is over the
+    rate limit.
+    """
+
+    __slots__ = ("tokens", "updated", "strikes")
+
+    tokens: float
+    updated: float
+    # The number of messages which arrived while the bucket was empty, since
+    # the bucket was last full
+    strikes: int
+
+    def __init__(self, tokens: float, now: float):
+        self.tokens = tokens
+        self.updated = now
+        self.strikes = 0
+
+
+class TokenBuckets:
+    """
+    A set of token buckets, one per key (such as a member's or channel's id),
+    which all share the same refill rate and burst size.
+
+    Buckets are refilled lazily when they are next used, so taking a token is
+    O(1). A bucket which has been idle long enough to refill completely is the
+    same as a new bucket, so such buckets are evicted from the front of the
+    least-recently-used ordering, keeping memory proportional to the number of
+    active keys.
+    """
+
+    buckets: collections.OrderedDict[Hashable, TokenBucket]
+
+    def __init__(self):
+        self.buckets = collections.OrderedDict()
+
+    def take(self, key: Hashable, rate: float, burst: float) -> TokenBucket:
+        """
+        Takes a token from a key's bucket, counting a strike if the bucket was
+        empty.
+
+        Args:
+            key: The key of the bucket.
+            rate: The number of tokens added to the bucket every second.
+            burst: The capacity of the bucket.
+
+        Returns:
+            The updated bucket. Its strikes are above zero if the key is over
+            the rate limit.
+        """
+        now = time.monotonic()
+        refill_seconds = burst / rate
+
+        # Evict buckets which have refilled completely
+        while self.buckets:
+            oldest = next(iter(self.buckets.values()))
+            if now - oldest.updated < refill_seconds:
+                break
+            self.buckets.popitem(last=False)
+
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(burst, now)
+            self.buckets[key] = bucket
+        else:
+            self.buckets.move_to_end(key)
+            bucket.tokens = min(burst, bucket.tokens + (now - bucket.updated) * rate)
+            bucket.updated = now
+            # A bucket which refilled completely starts a new flood from scratch
+            if bucket.tokens >= burst:
+                bucket.strikes = 0
+
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+        else:
+            bucket.strikes += 1
+        return bucket
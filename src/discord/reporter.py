@@ -4,7 +4,6 @@ members.
 """
 from __future__ import annotations
 
-import datetime
 import json
 from typing import TYPE_CHECKING
 
@@ -15,7 +14,7 @@ from discord.ext import commands
 from env import env
 from src.discord.globals import CHANNEL_CLOSED_REPORTS
 from src.discord.invitationals import update_invitational_list
-from src.mongo.models import Invitational
+from src.mongo.models import Cron, CronDeadLetter, Invitational
 
 if TYPE_CHECKING:
     from bot import PiBot
@@ -399,12 +398,14 @@ class Reporter(commands.Cog):
             view=InnapropriateUsername(member, 123, offending_username),
         )
 
-    async def create_cron_task_report(self, task: dict) -> None:
+    async def create_cron_task_report(self, task: Cron | CronDeadLetter) -> None:
         """
-        Creates a report that an error with a CRON task occurred.
+        Creates a report that an error with a CRON task occurred. Tasks are only
+        reported once they have given up retrying and were moved to the
+        dead-letter collection, so each broken task is reported a single time.
 
         Args:
-            task: The dictionary containing the CRON task.
+            task: The CRON task which failed.
         """
         guild: discord.Guild = self.bot.get_guild(env.server_id)
         reports_channel: discord.TextChannel = discord.utils.get(
@@ -413,22 +414,25 @@ class Reporter(commands.Cog):
         )
 
         # Serialize values
-        task["_id"] = str(task["_id"])  # ObjectID is not serializable by default
-        if "time" in task:
-            task["time"] = datetime.datetime.strftime(
-                task["time"],
-                "%m/%d/%Y, %H:%M:%S",
-            )  # datetime.datetime is not serializable by default
+        serialized = task.model_dump(mode="json", by_alias=True, exclude={"last_error"})
+        last_error = task.last_error or "Unknown error"
+        shortened_error = (
+            f"{last_error[:500]}..." if len(last_error) > 500 else last_error
+        )
 
         # Assemble the embed
         embed = discord.Embed(
             title="Error with CRON Task",
             description=f"""
-            There was an error with the following CRON task:
+            The following CRON task failed **{task.attempts} time(s)** and will no longer be retried:
             ```python
-            {json.dumps(task, indent = 4)}
+            {json.dumps(serialized, indent = 4)}
+            ```
+            The last attempt failed with:
+            ```
+            {shortened_error}
             ```
-            Because this likely a development error, no actions can immediately be taken. Please contact a developer to learn more.
+            Because this likely a development error, no actions can immediately be taken. The task was moved to the `cron_dead_letter` collection. Please contact a developer to learn more.
             """,
             color=discord.Color.brand_red(),
         )
@@ -473,6 +477,70 @@ class Reporter(commands.Cog):
         )
         await reports_channel.send(embed=embed)
 
+    async def create_match_timeout_report(self, source: str, content: str) -> None:
+        """
+        Reports to staff that matching user content against a staff-maintained
+        list took too long and was aborted.
+
+        Args:
+            source: What was being matched, such as "censor".
+            content: The content which caused the match to time out.
+        """
+        guild = self.bot.get_guild(env.server_id)
+        assert isinstance(guild, discord.Guild)
+
+        reports_channel = discord.utils.get(guild.text_channels, name="reports")
+        assert isinstance(reports_channel, discord.TextChannel)
+
+        shortened_content = f"{content[:500]}..." if len(content) > 500 else content
+        embed = discord.Embed(
+            title=f"Timeout in the {source} matcher",
+            description=f"""
+            Checking the following content against the {source} list took too long, so the check was aborted:
+            ```
+            {discord.utils.escape_markdown(shortened_content)}
+            ```
+            This usually means that an entry on the {source} list is a regular expression which backtracks excessively. Please review recently added entries.
+            """,
+            color=discord.Color.brand_red(),
+        )
+        await reports_channel.send(embed=embed)
+
+    async def create_ping_quarantine_report(
+        self,
+        user_id: int,
+        ping: str,
+        content: str,
+    ) -> None:
+        """
+        Reports to staff that a member's regular expression ping exceeded its
+        time budget while being matched, and has been quarantined.
+
+        Args:
+            user_id: The ID of the member whose ping was quarantined.
+            ping: The quarantined ping.
+            content: The content which caused the ping to time out.
+        """
+        guild = self.bot.get_guild(env.server_id)
+        assert isinstance(guild, discord.Guild)
+
+        reports_channel = discord.utils.get(guild.text_channels, name="reports")
+        assert isinstance(reports_channel, discord.TextChannel)
+
+        shortened_content = f"{content[:500]}..." if len(content) > 500 else content
+        embed = discord.Embed(
+            title="Ping Quarantined",
+            description=f"""
+            The ping `{discord.utils.escape_markdown(ping)}` of <@{user_id}> took too long to match the following content, so it will no longer be matched:
+            ```
+            {discord.utils.escape_markdown(shortened_content)}
+            ```
+            The ping stays quarantined until the member removes it or Pi-Bot restarts. Consider asking the member to replace it with a simpler ping.
+            """,
+            color=discord.Color.orange(),
+        )
+        await reports_channel.send(embed=embed)
+
     async def create_invitational_request_report(
         self,
         user: discord.Member,
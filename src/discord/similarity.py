@@ -0,0 +1,201 @@
+"""
+Holds the index used to find near-duplicate messages sent by different members
+across channels, such as during a coordinated raid.
+"""
+from __future__ import annotations
+
+import collections
+import random
+import re
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from src.discord.features import MessageFeatures
+
+HASH_MASK = (1 << 64) - 1
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+class DuplicateCluster:
+    """
+    A group of messages which are near-duplicates of each other.
+    """
+
+    __slots__ = ("authors", "channels", "message_count", "sample", "reported")
+
+    authors: set[int]
+    channels: set[int]
+    message_count: int
+    # The content of the first message in the cluster
+    sample: str
+    # Whether staff have already been told about the cluster
+    reported: bool
+
+    def __init__(self, sample: str):
+        self.authors = set()
+        self.channels = set()
+        self.message_count = 0
+        self.sample = sample
+        self.reported = False
+
+
+class _Entry:
+    __slots__ = ("created", "signature", "keys", "cluster")
+
+    def __init__(
+        self,
+        created: float,
+        signature: tuple[int, ...],
+        keys: list[tuple],
+        cluster: DuplicateCluster,
+    ):
+        self.created = created
+        self.signature = signature
+        self.keys = keys
+        self.cluster = cluster
+
+
+class NearDuplicateIndex:
+    """
+    Finds messages which are near-duplicates of messages sent recently, by any
+    member in any channel.
+
+    Each message is reduced to a MinHash signature over the character shingles
+    of its first max_length characters, where each hash function is the shingle
+    hash XORed with a random mask.
+    The signature is split into bands, and each band is hashed into a bucket, so
+    only messages sharing at least one bucket are compared (locality-sensitive
+    hashing), which keeps lookups sub-linear in the number of recent messages.
+    Candidates whose signatures agree on enough positions join the same
+    cluster. Messages older than the window are expired from the front.
+    """
+
+    buckets: dict[tuple, collections.deque[_Entry]]
+    entries: collections.deque[_Entry]
+
+    def __init__(
+        self,
+        window_seconds: float = 60,
+        bands: int = 8,
+        rows: int = 4,
+        min_similarity: float = 0.6,
+        min_length: int = 20,
+        shingle_size: int = 4,
+        author_threshold: int = 4,
+        max_length: int = 256,
+    ):
+        self.window_seconds = window_seconds
+        self.bands = bands
+        self.rows = rows
+        self.min_similarity = min_similarity
+        self.min_length = min_length
+        self.shingle_size = shingle_size
+        self.author_threshold = author_threshold
+        self.max_length = max_length
+        self.buckets = {}
+        self.entries = collections.deque()
+
+        rng = random.Random(0x51DE)
+        self._masks = [rng.getrandbits(64) for _ in range(bands * rows)]
+
+    def signature(
+        self,
+        text: str,
+        timeout: float | None = None,
+    ) -> tuple[int, ...] | None:
+        """
+        Computes the MinHash signature of some text, or None if the text is too
+        short to compare meaningfully. Only reads the index's fixed parameters,
+        so it can run on a worker while the index is used on the event loop.
+
+        Raises:
+            TimeoutError: Computing the signature exceeded the time budget.
+        """
+        text = WHITESPACE_PATTERN.sub(" ", text[: self.max_length * 2]).strip()
+        text = text[: self.max_length]
+        if len(text) < self.min_length:
+            return None
+
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        # Shingles only need to hash consistently within this process
+        hashes = {
+            hash(text[i : i + self.shingle_size]) & HASH_MASK
+            for i in range(len(text) - self.shingle_size + 1)
+        }
+        signature = []
+        for mask in self._masks:
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError("MinHash signature timed out")
+            signature.append(min([h ^ mask for h in hashes]))
+        return tuple(signature)
+
+    def _expire(self, cutoff: float) -> None:
+        # Entries are expired in insertion order, so each expiring entry is at
+        # the front of every bucket it belongs to
+        while self.entries and self.entries[0].created < cutoff:
+            entry = self.entries.popleft()
+            for key in entry.keys:
+                bucket = self.buckets[key]
+                bucket.popleft()
+                if not bucket:
+                    del self.buckets[key]
+
+    def add(
+        self,
+        author_id: int,
+        channel_id: int,
+        features: MessageFeatures,
+        signature: tuple[int, ...] | None,
+    ) -> DuplicateCluster | None:
+        """
+        Adds a message to the index, given its signature as computed by
+        signature().
+
+        Returns:
+            The message's cluster if adding the message made the cluster span
+            enough distinct authors to be reported and it has not been reported
+            yet, otherwise None.
+        """
+        now = time.monotonic()
+        self._expire(now - self.window_seconds)
+
+        if signature is None:
+            return None
+
+        keys = [
+            (band, signature[band * self.rows : (band + 1) * self.rows])
+            for band in range(self.bands)
+        ]
+
+        cluster = None
+        checked: set[int] = set()
+        for key in keys:
+            for candidate in self.buckets.get(key, ()):
+                if id(candidate) in checked:
+                    continue
+                checked.add(id(candidate))
+                agreeing = sum(
+                    1 for x, y in zip(signature, candidate.signature) if x == y
+                )
+                if agreeing / len(signature) >= self.min_similarity:
+                    cluster = candidate.cluster
+                    break
+            if cluster is not None:
+                break
+
+        if cluster is None:
+            cluster = DuplicateCluster(features.content)
+        cluster.authors.add(author_id)
+        cluster.channels.add(channel_id)
+        cluster.message_count += 1
+
+        entry = _Entry(now, signature, keys, cluster)
+        self.entries.append(entry)
+        for key in keys:
+            self.buckets.setdefault(key, collections.deque()).append(entry)
+
+        if not cluster.reported and len(cluster.authors) >= self.author_threshold:
+            cluster.reported = True
+            return cluster
+        return None
@@ -1,13 +1,22 @@
 from __future__ import annotations
 
+import contextlib
 import datetime
-from typing import TYPE_CHECKING
+import time
+from typing import TYPE_CHECKING, Any
 
 import discord
 from discord.ext import commands
 
 from env import env
+from src.discord.features import MessageFeatures
 from src.discord.globals import ROLE_MUTED
+from src.discord.matching import MatchPoolFullError, MatchWorkerPool
+from src.discord.moderation import ModerationAction, ModerationCoordinator
+from src.discord.ratelimit import TokenBuckets
+from src.discord.similarity import DuplicateCluster, NearDuplicateIndex
+from src.discord.spamwindow import AuthorWindow, AuthorWindows
+from src.mongo.models import Settings
 
 if TYPE_CHECKING:
     from bot import PiBot
@@ -17,116 +26,281 @@ if TYPE_CHECKING:
 
 class SpamManager(commands.Cog):
 
-    recent_messages: list[discord.Message]
+    # The recent messages of each author
+    recent_messages: AuthorWindows
+    # Recent messages of every author, used to find near-duplicates sent by raids
+    duplicates: NearDuplicateIndex
+    # Computes the duplicate index's signatures off the event loop
+    pool: MatchWorkerPool
+    # Message rate limits; rates and burst sizes are stored in Settings
+    member_buckets: TokenBuckets
+    channel_buckets: TokenBuckets
+    # When each flooded channel was last reported to staff
+    flood_reports: dict[int, float]
+    # Deduplicates warnings and mutes triggered by the checks
+    moderation: ModerationCoordinator
 
     # Limits
-    recent_messages_limit = 20  # The number of recent messages that are stored
+    window_seconds = 120  # How long a message counts towards its author's limits
     caps_limit = 8  # The number of messages that can be sent containing caps before a mute is issued
     mute_limit = 6  # The number of messages that can be sent containing the same content before a mute is issued
+    rate_mute_limit = 5  # The number of messages that can be sent over the rate limit before a mute is issued
+    flood_report_seconds = (
+        600  # How often a channel which stays flooded is reported again
+    )
     warning_limit = 3  # The number of messages that can be sent containing caps or the same content before a warning is issued to the offending user
 
     def __init__(self, bot: PiBot):
         self.bot = bot
-        self.recent_messages = []
-
-    def has_caps(self, message: discord.Message) -> bool:
-        """
-        Returns true if the message has caps (more capitalized letters than lowercase letters)
-        """
-        caps = False
-        upper_count = sum(1 for c in message.content if c.isupper())
-        lower_count = sum(1 for c in message.content if c.islower())
-        if upper_count > (lower_count + 3):
-            caps = True
-
-        return caps
-
-    async def check_for_repetition(self, message: discord.Message) -> None:
+        self.recent_messages = AuthorWindows(self.window_seconds)
+        self.duplicates = NearDuplicateIndex()
+        self.pool = MatchWorkerPool(timeout=0.1)
+        self.member_buckets = TokenBuckets()
+        self.channel_buckets = TokenBuckets()
+        self.flood_reports = {}
+        self.moderation = ModerationCoordinator()
+
+    async def cog_load(self) -> None:
+        self.bot.pipeline.register("spam", 20, self.store_and_validate)
+
+    async def cog_unload(self) -> None:
+        self.bot.pipeline.unregister("spam")
+        self.pool.shutdown()
+
+    async def check_for_repetition(
+        self,
+        message: discord.Message,
+        features: MessageFeatures,
+        window: AuthorWindow,
+    ) -> None:
         """
         Checks to see if the message has often been repeated recently, and takes action if action is needed.
         """
         # Type checking
         assert isinstance(message.author, discord.Member)
 
-        matching_messages = filter(
-            lambda m: m.author == message.author
-            and m.content.lower() == message.content.lower(),
-            self.recent_messages,
-        )
-        matching_messages_count = len(list(matching_messages))
+        matching_messages_count = window.fingerprint_counts[features.fingerprint]
 
         if matching_messages_count >= self.mute_limit:
-            await self.mute(message.author)
-
-            # Send info message to channel about mute
-            info_message = await message.channel.send(
-                f"Successfully muted {message.author.mention} for 1 hour.",
+            await self.auto_mute(
+                message,
+                f"**repeatedly spamming similar messages** (sent **{self.mute_limit} messages** after being repeatedly warned)",
+            )
+        elif matching_messages_count >= self.warning_limit:
+            await self.warn(
+                message,
+                "repetition",
+                f"{message.author.mention}, please avoid spamming. Additional spam will lead to your account being temporarily muted.",
             )
 
-            # Send info message to staff about mute
-            staff_embed_message = discord.Embed(
-                title="Automatic mute occurred",
-                color=discord.Color.yellow(),
-                description=f"""
-                {message.author.mention} was automatically muted in {message.channel} for **repeatedly spamming similar messages**. The user was **repeatedly warned**, and sent **{self.mute_limit} messages** before a mute was applied.
+    async def check_for_caps(
+        self,
+        message: discord.Message,
+        features: MessageFeatures,
+        window: AuthorWindow,
+    ) -> None:
+        """
+        Checks the message to see if it and recent messages contain a lot of capital letters.
+        """
+        # Type checking
+        assert isinstance(message.author, discord.Member)
 
-                Their mute will automatically expire in: {discord.utils.format_dt(discord.utils.utcnow() + datetime.timedelta(hours = 1), 'R')}.
+        caps_messages_count = window.caps_count
 
-                No further action needs to be taken. To teleport to the issue, please [click here]({info_message.jump_url}). Please know that the offending messages may have been deleted by the author or staff.
-                """,
+        if caps_messages_count >= self.caps_limit and features.has_caps:
+            await self.auto_mute(
+                message,
+                f"**repeatedly using caps** in their messages (sent **{self.caps_limit} messages** after being repeatedly warned)",
             )
-            reporter_cog: commands.Cog | Reporter = self.bot.get_cog("Reporter")
-            await reporter_cog.create_staff_message(staff_embed_message)
-        elif matching_messages_count >= self.warning_limit:
-            await message.author.send(
-                f"{message.author.mention}, please avoid spamming. Additional spam will lead to your account being temporarily muted.",
+        elif caps_messages_count >= self.warning_limit and features.has_caps:
+            await self.warn(
+                message,
+                "caps",
+                f"{message.author.mention}, please avoid using all caps in your messages. Repeatedly doing so will cause your account to be temporarily muted.",
             )
 
-    async def check_for_caps(self, message: discord.Message) -> None:
+    def setting(self, name: str) -> Any:
         """
-        Checks the message to see if it and recent messages contain a lot of capital letters.
+        Returns a setting, or its default value if the settings have not been
+        loaded yet (they are loaded once the bot is ready).
+        """
+        settings = getattr(self.bot, "settings", None)
+        if settings is None:
+            return Settings.model_fields[name].default
+        return getattr(settings, name)
+
+    async def check_for_flooding(self, message: discord.Message) -> None:
+        """
+        Checks whether the author or the channel are sending messages faster than
+        their rate limit, and takes action if action is needed.
         """
         # Type checking
         assert isinstance(message.author, discord.Member)
 
-        caps_messages = filter(
-            lambda m: m.author == message.author
-            and self.has_caps(m)
-            and len(m.content) > 5,
-            self.recent_messages,
+        member_bucket = self.member_buckets.take(
+            message.author.id,
+            self.setting("member_message_rate"),
+            self.setting("member_message_burst"),
+        )
+        channel_rate = self.setting("channel_message_rate")
+        channel_burst = self.setting("channel_message_burst")
+        channel_bucket = self.channel_buckets.take(
+            message.channel.id,
+            channel_rate,
+            channel_burst,
         )
-        caps_messages_count = len(list(caps_messages))
-
-        if caps_messages_count >= self.caps_limit and self.has_caps(message):
-            await self.mute(message.author)
 
-            # Send info message to channel about mute
-            info_message = await message.channel.send(
-                f"Successfully muted {message.author.mention} for 1 hour.",
+        if member_bucket.strikes == self.rate_mute_limit:
+            await self.auto_mute(
+                message,
+                f"**sending messages too quickly** (sent **{self.rate_mute_limit} messages** over the rate limit after being warned)",
+            )
+        elif member_bucket.strikes == 1:
+            await self.warn(
+                message,
+                "rate",
+                f"{message.author.mention}, please slow down. Sending messages this quickly will lead to your account being temporarily muted.",
             )
 
-            # Send info message to staff about mute
+        # A flood is reported when the channel first runs out of tokens, and again
+        # every flood_report_seconds while the channel stays flooded
+        if channel_bucket.strikes and self.should_report_flood(
+            message.channel.id,
+            channel_bucket.strikes,
+        ):
             staff_embed_message = discord.Embed(
-                title="Automatic mute occurred",
-                color=discord.Color.yellow(),
+                title="Channel flood detected",
+                color=discord.Color.orange(),
                 description=f"""
-                {message.author.mention} was automatically muted in {message.channel} for **repeatedly using caps** in their messages. The user was **repeatedly warned**, and sent **{self.caps_limit} messages** before a mute was applied.
+                {message.channel.mention} is receiving more than **{channel_rate:g} messages per second** (with bursts of up to {channel_burst}).
 
-                Their mute will automatically expire in: {discord.utils.format_dt(discord.utils.utcnow() + datetime.timedelta(hours = 1), 'R')}.
-
-                No further action needs to be taken. To teleport to the issue, please [click here]({info_message.jump_url}). Please know that the offending messages may have been deleted by the author or staff.
+                No automatic action was taken. Members sending messages too quickly are muted individually. Consider enabling slowmode in the channel. To teleport to the channel, please [click here]({message.jump_url}).
                 """,
             )
             reporter_cog: commands.Cog | Reporter = self.bot.get_cog("Reporter")
             await reporter_cog.create_staff_message(staff_embed_message)
-        elif caps_messages_count >= self.warning_limit and self.has_caps(message):
-            await message.author.send(
-                f"{message.author.mention}, please avoid using all caps in your messages. Repeatedly doing so will cause your account to be temporarily muted.",
-            )
 
-    async def mute(self, member: discord.Member) -> None:
+    def should_report_flood(self, channel_id: int, strikes: int) -> bool:
+        """
+        Returns whether a flooded channel should be reported to staff: either
+        the flood just started, or the last report is older than
+        flood_report_seconds.
+        """
+        now = time.monotonic()
+        last_report = self.flood_reports.get(channel_id)
+        if (
+            strikes == 1
+            or last_report is None
+            or (now - last_report >= self.flood_report_seconds)
+        ):
+            self.flood_reports[channel_id] = now
+            return True
+        return False
+
+    async def report_duplicate_cluster(self, cluster: DuplicateCluster) -> None:
+        """
+        Sends staff a single report about a group of near-duplicate messages sent
+        by several members, which usually indicates a coordinated raid.
+        """
+        authors = " ".join(
+            f"<@{author_id}>" for author_id in list(cluster.authors)[:25]
+        )
+        channels = " ".join(f"<#{channel_id}>" for channel_id in cluster.channels)
+        sample = (
+            f"{cluster.sample[:500]}..."
+            if len(cluster.sample) > 500
+            else cluster.sample
+        )
+        staff_embed_message = discord.Embed(
+            title="Possible raid detected",
+            color=discord.Color.orange(),
+            description=f"""
+            **{len(cluster.authors)} members** sent **{cluster.message_count} near-identical messages** within {self.duplicates.window_seconds:.0f} seconds.
+
+            **Members:** {authors}
+            **Channels:** {channels}
+
+            The first message read:
+            ```
+            {discord.utils.escape_markdown(sample)}
+            ```
+            No automatic action was taken. Please review the messages and take action if needed.
+            """,
+        )
+        reporter_cog: commands.Cog | Reporter = self.bot.get_cog("Reporter")
+        await reporter_cog.create_staff_message(staff_embed_message)
+
+    async def warn(self, message: discord.Message, kind: str, warning: str) -> None:
+        """
+        Sends a warning to the author of a message, unless they were already
+        warned recently by the same check.
+
+        Args:
+            message (discord.Message): The message which triggered the warning.
+            kind (str): The check which triggered the warning. Warnings from
+                different checks are deduplicated separately, so that each
+                check warns before it mutes.
+            warning (str): The warning to send.
+        """
+        assert isinstance(message.author, discord.Member)
+        if self.moderation.claim(
+            message.author,
+            f"warn:{kind}",
+            warning,
+            message.channel,
+        ):
+            await message.author.send(warning)
+
+    async def auto_mute(self, message: discord.Message, reason: str) -> None:
+        """
+        Mutes the author of a message for an hour, announces the mute in the
+        channel and reports it to staff. If the author was already muted
+        automatically within the coordinator's window, the reason is only added
+        to that mute's report.
+        """
+        assert isinstance(message.author, discord.Member)
+        action = self.moderation.claim(message.author, "mute", reason, message.channel)
+        if action is None:
+            return
+
+        if not await self.mute(message.author):
+            return  # Already muted, such as by staff
+
+        # Send info message to channel about mute
+        info_message = await message.channel.send(
+            f"Successfully muted {message.author.mention} for 1 hour.",
+        )
+        action.jump_url = info_message.jump_url
+        self.moderation.report_later(action, self.report_mute)
+
+    async def report_mute(self, action: ModerationAction) -> None:
+        """
+        Sends staff a single report about an automatic mute, listing every reason
+        it was triggered for.
+        """
+        reasons = "\n".join(f"- {reason}" for reason in action.reasons)
+        staff_embed_message = discord.Embed(
+            title="Automatic mute occurred",
+            color=discord.Color.yellow(),
+            description=f"""
+            {action.member.mention} was automatically muted in {action.channel} for:
+            {reasons}
+
+            Their mute will automatically expire in: {discord.utils.format_dt(discord.utils.utcnow() + datetime.timedelta(hours = 1), 'R')}.
+
+            No further action needs to be taken. To teleport to the issue, please [click here]({action.jump_url}). Please know that the offending messages may have been deleted by the author or staff.
+            """,
+        )
+        reporter_cog: commands.Cog | Reporter = self.bot.get_cog("Reporter")
+        await reporter_cog.create_staff_message(staff_embed_message)
+
+    async def mute(self, member: discord.Member) -> bool:
         """
         Mutes the user and schedules an unmute for an hour later in CRON.
+
+        Returns:
+            Whether the user was muted, which is False if they already had the
+            muted role.
         """
         guild: discord.Guild = self.bot.get_guild(env.server_id)
         muted_role = discord.utils.get(guild.roles, name=ROLE_MUTED)
@@ -135,26 +309,48 @@ class SpamManager(commands.Cog):
         # Type checking
         assert isinstance(muted_role, discord.Role)
 
+        if muted_role in member.roles:
+            return False
+
         cron_cog: commands.Cog | CronTasks = self.bot.get_cog("CronTasks")
         await cron_cog.schedule_unmute(member, unmute_time)
         await member.add_roles(muted_role)
+        return True
 
-    async def store_and_validate(self, message: discord.Message) -> None:
+    async def store_and_validate(
+        self,
+        message: discord.Message,
+        features: MessageFeatures,
+    ) -> None:
         """
-        Stores a message in recent_messages and validates whether the message is spam or not.
+        Stores a message in its author's window of recent messages and validates whether the message is spam or not.
         """
         # No need to take action for bots
         if message.author.bot:
             return
 
         # Store message
-        self.recent_messages.insert(0, message)
-        self.recent_messages = self.recent_messages[
-            : self.recent_messages_limit
-        ]  # Only store 20 recent messages at once
+        window = self.recent_messages.add(message.author.id, features)
+        # A timeout or a full pool only skips the near-duplicate check
+        signature = None
+        if len(features.text) >= self.duplicates.min_length:
+            with contextlib.suppress(TimeoutError, MatchPoolFullError):
+                signature = await self.pool.run(
+                    self.duplicates.signature,
+                    features.text,
+                )
+        cluster = self.duplicates.add(
+            message.author.id,
+            message.channel.id,
+            features,
+            signature,
+        )
+        if cluster is not None:
+            await self.report_duplicate_cluster(cluster)
 
-        await self.check_for_repetition(message)
-        await self.check_for_caps(message)
+        await self.check_for_flooding(message)
+        await self.check_for_repetition(message, features, window)
+        await self.check_for_caps(message, features, window)
 
 
 async def setup(bot: PiBot):
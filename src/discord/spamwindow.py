@@ -0,0 +1,96 @@
+"""
+Holds the per-author sliding windows of recent messages used by the spam
+detector.
+"""
+from __future__ import annotations
+
+import collections
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from src.discord.features import MessageFeatures
+
+
+class AuthorWindow:
+    """
+    The messages an author sent within the window, along with running counts
+    which are updated as messages enter and leave the window, so checking an
+    author never rescans their messages.
+    """
+
+    __slots__ = ("entries", "fingerprint_counts", "caps_count", "last_seen")
+
+    # (time sent, content fingerprint, whether the message counts as caps)
+    entries: collections.deque[tuple[float, bytes, bool]]
+    fingerprint_counts: collections.Counter[bytes]
+    caps_count: int
+    last_seen: float
+
+    def __init__(self):
+        self.entries = collections.deque()
+        self.fingerprint_counts = collections.Counter()
+        self.caps_count = 0
+        self.last_seen = 0.0
+
+    def add(self, now: float, fingerprint: bytes, caps: bool) -> None:
+        self.entries.append((now, fingerprint, caps))
+        self.fingerprint_counts[fingerprint] += 1
+        self.caps_count += caps
+        self.last_seen = now
+
+    def expire(self, cutoff: float) -> None:
+        """
+        Drops the messages sent before the cutoff from the window.
+        """
+        while self.entries and self.entries[0][0] < cutoff:
+            _, fingerprint, caps = self.entries.popleft()
+            self.fingerprint_counts[fingerprint] -= 1
+            if not self.fingerprint_counts[fingerprint]:
+                del self.fingerprint_counts[fingerprint]
+            self.caps_count -= caps
+
+
+class AuthorWindows:
+    """
+    Keeps a time-based sliding window of recent messages for each author.
+
+    Authors are kept in order of their last message, so authors who have been
+    idle for longer than the window are evicted from the front in amortized O(1)
+    per message, and memory stays proportional to the number of active authors.
+    """
+
+    windows: collections.OrderedDict[int, AuthorWindow]
+
+    def __init__(self, window_seconds: float = 120):
+        self.window_seconds = window_seconds
+        self.windows = collections.OrderedDict()
+
+    def add(self, author_id: int, features: MessageFeatures) -> AuthorWindow:
+        """
+        Adds a message to its author's window and returns the updated window.
+        """
+        now = time.monotonic()
+        cutoff = now - self.window_seconds
+
+        # Evict authors whose whole window has expired
+        while self.windows:
+            oldest = next(iter(self.windows.values()))
+            if oldest.last_seen >= cutoff:
+                break
+            self.windows.popitem(last=False)
+
+        window = self.windows.get(author_id)
+        if window is None:
+            window = AuthorWindow()
+            self.windows[author_id] = window
+        else:
+            self.windows.move_to_end(author_id)
+            window.expire(cutoff)
+
+        window.add(
+            now,
+            features.fingerprint,
+            features.has_caps and len(features.content) > 5,
+        )
+        return window
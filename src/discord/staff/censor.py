@@ -19,12 +19,20 @@ from src.mongo.models import Censor
 
 if TYPE_CHECKING:
     from bot import PiBot
+    from src.discord.censor import Censor as CensorCog
 
 
 class StaffCensor(commands.Cog):
     def __init__(self, bot: PiBot):
         self.bot = bot
 
+    def refresh_censor_matcher(self) -> None:
+        """
+        Recompiles the censor matcher after the censor list was changed.
+        """
+        censor_cog: commands.Cog | CensorCog = self.bot.get_cog("Censor")
+        censor_cog.refresh_matcher()
+
     censor_group = app_commands.Group(
         name="censor",
         description="Controls Pi-Bot's censor.",
@@ -62,6 +70,7 @@ class StaffCensor(commands.Cog):
                 )
             else:
                 await src.discord.globals.CENSOR.update(Push({Censor.words: phrase}))
+                self.refresh_censor_matcher()
                 first_letter = phrase[0]
                 last_letter = phrase[-1]
                 await interaction.edit_original_response(
@@ -74,6 +83,7 @@ class StaffCensor(commands.Cog):
                 )
             else:
                 await src.discord.globals.CENSOR.update(Push({Censor.emojis: phrase}))
+                self.refresh_censor_matcher()
                 await interaction.edit_original_response(
                     content="Added emoji to the censor list.",
                 )
@@ -108,6 +118,7 @@ class StaffCensor(commands.Cog):
                 )
             else:
                 await src.discord.globals.CENSOR.update(Pull({Censor.words: phrase}))
+                self.refresh_censor_matcher()
                 await interaction.edit_original_response(
                     content=f"Removed `{phrase}` from the censor list.",
                 )
@@ -118,10 +129,32 @@ class StaffCensor(commands.Cog):
                 )
             else:
                 await src.discord.globals.CENSOR.update(Pull({Censor.emojis: phrase}))
+                self.refresh_censor_matcher()
                 await interaction.edit_original_response(
                     content=f"Removed {phrase} from the emojis list.",
                 )
 
+    @censor_group.command(
+        name="stats",
+        description="Staff command. Shows how often the censor verdict cache is hit.",
+    )
+    @app_commands.checks.has_any_role(ROLE_STAFF, ROLE_VIP)
+    async def censor_stats(self, interaction: discord.Interaction):
+        # Check for staff permissions again
+        commandchecks.is_staff_from_ctx(interaction)
+
+        censor_cog: commands.Cog | CensorCog = self.bot.get_cog("Censor")
+        verdicts = censor_cog.verdicts
+        lookups = verdicts.hits + verdicts.misses
+        hit_rate = verdicts.hits / lookups if lookups else 0
+        await interaction.response.send_message(
+            f"Censor list version: `{censor_cog.matcher.version}`\n"
+            f"Cached verdicts: `{len(verdicts.verdicts)}`\n"
+            f"Cache hits: `{verdicts.hits}` / misses: `{verdicts.misses}` "
+            f"(`{hit_rate:.1%}` hit rate)",
+            ephemeral=True,
+        )
+
 
 async def setup(bot: PiBot):
     await bot.add_cog(StaffCensor(bot))
@@ -8,13 +8,11 @@ import re
 from typing import TYPE_CHECKING, Literal
 
 import discord
-import matplotlib.pyplot as plt
 from beanie.odm.operators.update.general import Set
 from discord import app_commands
 from discord.ext import commands
 
 import commandchecks
-import src.discord.globals
 from env import env
 from src.discord.globals import (
     CATEGORY_GENERAL,
@@ -41,12 +39,13 @@ from src.discord.globals import (
     ROLE_WM,
 )
 from src.discord.invitationals import update_invitational_list
-from src.mongo.models import Cron, Ping, Settings
-from src.wiki.mosteditstable import run_table
+from src.discord.membercount import MemberCounter
+from src.mongo.models import Cron, Settings
 
 if TYPE_CHECKING:
     from bot import PiBot
 
+    from .ping import PingManager
     from .tasks import CronTasks
 
 
@@ -1274,6 +1273,45 @@ class StaffNonessential(StaffCommands, name="StaffNonesntl"):
             content="Unlocked the channel to Member access. Please check if permissions need to be synced.",
         )
 
+    @app_commands.command(
+        description="Staff command. Shows how many members joined and left the server each day.",
+    )
+    @app_commands.describe(days="The number of days to show, up to 30.")
+    @app_commands.checks.has_any_role(ROLE_STAFF, ROLE_VIP)
+    @app_commands.default_permissions(moderate_members=True)
+    @app_commands.guilds(*env.slash_command_guilds)
+    async def growth(
+        self,
+        interaction: discord.Interaction,
+        days: app_commands.Range[int, 1, 30] = 14,
+    ):
+        """Shows the daily member join and leave counters"""
+        commandchecks.is_staff_from_ctx(interaction)
+
+        history = await MemberCounter.history(days)
+        if not history:
+            return await interaction.response.send_message(
+                "No joins or leaves have been recorded in that time.",
+            )
+
+        rows = [
+            f"{day.day:%Y-%m-%d}  +{day.joins:<4} -{day.leaves:<4} {day.joins - day.leaves:+5}  {day.member_count}"
+            for day in history
+        ]
+        total_joins = sum(day.joins for day in history)
+        total_leaves = sum(day.leaves for day in history)
+        table = "\n".join(["Day         Joins Leaves Net  Members", *rows])
+        embed = discord.Embed(
+            title="Member Growth",
+            color=discord.Color.blurple(),
+            description=(
+                f"```\n{table}\n```\n"
+                f"In total, **{total_joins}** members joined and **{total_leaves}** members left "
+                f"({total_joins - total_leaves:+})."
+            ),
+        )
+        await interaction.response.send_message(embed=embed)
+
     @app_commands.command(
         description="Staff command. Runs Pi-Bot's Most Edits Table wiki functionality.",
     )
@@ -1287,7 +1325,13 @@ class StaffNonessential(StaffCommands, name="StaffNonesntl"):
         await interaction.response.send_message(
             f"{EMOJI_LOADING} Generating the Most Edits Table...",
         )
-        res = await run_table()
+        # Both are heavy and only needed by this command, so they are imported on
+        # first use
+        mosteditstable = await self.bot.startup.import_module(
+            "src.wiki.mosteditstable",
+        )
+        plt = await self.bot.startup.import_module("matplotlib.pyplot")
+        res = await mosteditstable.run_table()
         names = [v["name"] for v in res]
         data = [v["increase"] for v in res]
         names = names[:10]
@@ -1368,7 +1412,8 @@ class StaffNonessential(StaffCommands, name="StaffNonesntl"):
             await interaction.edit_original_response(
                 content=f"{EMOJI_LOADING} Updating all users' pings.",
             )
-            src.discord.globals.PING_INFO = Ping.find_all().to_list()
+            ping_cog: commands.Cog | PingManager = self.bot.get_cog("PingManager")
+            await ping_cog.reload_pings()
             await interaction.edit_original_response(
                 content=":white_check_mark: Updated all users' pings.",
             )
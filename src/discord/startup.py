@@ -0,0 +1,181 @@
+"""
+Holds the startup manager, which loads Pi-Bot's extensions, defers heavy
+imports until they are first needed and initializes the wiki in the background.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import importlib
+import logging
+import sys
+import time
+from types import ModuleType
+from typing import TYPE_CHECKING
+
+from discord.ext import commands
+
+from env import env
+
+if TYPE_CHECKING:
+    from bot import PiBot
+
+
+logger = logging.getLogger(__name__)
+
+
+class ExtensionTiming:
+    """
+    How long an extension took to load, split between executing its module
+    (including every module it imported for the first time) and adding its cogs.
+    """
+
+    __slots__ = ("name", "total", "setup", "failed")
+
+    name: str
+    total: float
+    setup: float
+    failed: bool
+
+    def __init__(self, name: str):
+        self.name = name
+        self.total = 0
+        self.setup = 0
+        self.failed = False
+
+    @property
+    def imports(self) -> float:
+        return self.total - self.setup
+
+
+# The extension being loaded by the current task, which cog setup time is added to
+_loading: contextvars.ContextVar[ExtensionTiming | None] = contextvars.ContextVar(
+    "loading_extension",
+    default=None,
+)
+
+
+class StartupManager:
+    """
+    Loads extensions concurrently and keeps heavy, rarely used modules out of the
+    startup path.
+
+    Extension modules are still executed one at a time (imports hold the
+    interpreter), but each extension's setup runs as its own task, so setups
+    which wait on I/O overlap. Heavy modules such as matplotlib, wikipedia and
+    pywikibot are imported on a worker thread the first time a command needs
+    them, and the wiki session is logged into in the background once the
+    extensions are loaded, instead of blocking the import of the wiki module.
+    """
+
+    timings: list[ExtensionTiming]
+    # How long each lazily imported module took to import
+    lazy_imports: dict[str, float]
+
+    def __init__(self, bot: PiBot):
+        self.bot = bot
+        self.timings = []
+        self.lazy_imports = {}
+        self.total = 0.0
+        self._imports: dict[str, asyncio.Task[ModuleType]] = {}
+        self._wiki_task: asyncio.Task[None] | None = None
+
+    async def load_extensions(self, extensions: tuple[str, ...]) -> None:
+        """
+        Loads every extension and logs how long each one took.
+        """
+        start = time.perf_counter()
+        self.timings = list(
+            await asyncio.gather(*(self._load(name) for name in extensions)),
+        )
+        self.total = time.perf_counter() - start
+
+        loaded = sum(not timing.failed for timing in self.timings)
+        logger.info(
+            f"Enabled {loaded}/{len(extensions)} extensions in {self.total:.2f}s",
+        )
+        for timing in sorted(self.timings, key=lambda t: t.total, reverse=True):
+            logger.info(
+                f"  {timing.name}: {timing.total * 1000:.0f} ms "
+                f"(import {timing.imports * 1000:.0f} ms, "
+                f"setup {timing.setup * 1000:.0f} ms)"
+                + (" FAILED" if timing.failed else ""),
+            )
+
+    async def _load(self, name: str) -> ExtensionTiming:
+        timing = ExtensionTiming(name)
+        _loading.set(timing)
+        start = time.perf_counter()
+        try:
+            await self.bot.load_extension(name)
+        except commands.ExtensionError:
+            timing.failed = True
+            logger.exception(f"Failed to load extension {name}!")
+        timing.total = time.perf_counter() - start
+        return timing
+
+    @staticmethod
+    def record_setup(seconds: float) -> None:
+        """
+        Adds time spent setting up a cog to the extension being loaded, if any.
+        """
+        timing = _loading.get()
+        if timing is not None:
+            timing.setup += seconds
+
+    async def import_module(self, name: str) -> ModuleType:
+        """
+        Imports a module on a worker thread, so that importing a heavy module for
+        the first time does not block the event loop.
+        """
+        task = self._imports.get(name)
+        if task is None:
+            # Only trust sys.modules when the import is not in progress, as it
+            # holds partially initialized modules while they are being imported
+            module = sys.modules.get(name)
+            if module is not None:
+                return module
+            task = asyncio.create_task(self._import(name))
+            self._imports[name] = task
+        return await asyncio.shield(task)
+
+    async def _import(self, name: str) -> ModuleType:
+        start = time.perf_counter()
+        try:
+            module = await asyncio.to_thread(importlib.import_module, name)
+        except Exception:
+            # Allow the import to be retried
+            self._imports.pop(name, None)
+            raise
+        self.lazy_imports[name] = time.perf_counter() - start
+        logger.info(f"Imported {name} in {self.lazy_imports[name]:.2f}s")
+        return module
+
+    def start_wiki(self) -> None:
+        """
+        Starts initializing the wiki session in the background.
+        """
+        if self._wiki_task is None:
+            self._wiki_task = asyncio.create_task(self._init_wiki(), name="wiki-init")
+
+    async def _init_wiki(self) -> None:
+        if not (env.pi_bot_wiki_username and env.pi_bot_wiki_password):
+            logger.info(
+                "User did not supply keys for wiki functionality; not turned on.",
+            )
+            return
+
+        try:
+            wiki = await self.import_module("src.wiki.wiki")
+            await wiki.init_wiki(env.pi_bot_wiki_username, env.pi_bot_wiki_password)
+        except Exception:
+            logger.exception("Could not initialize the wiki.")
+
+    async def wiki(self) -> ModuleType:
+        """
+        Returns the wiki module, waiting for the wiki session to be initialized
+        if it is still being set up.
+        """
+        if self._wiki_task is not None:
+            await asyncio.shield(self._wiki_task)
+        return await self.import_module("src.wiki.wiki")
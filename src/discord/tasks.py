@@ -12,13 +12,17 @@ from discord.ext import commands, tasks
 
 import src.discord.globals
 from env import env
+from src.discord.cronscheduler import CronScheduler
 from src.discord.invitationals import update_invitational_list
+from src.discord.membercount import MemberCounter
 from src.discord.views import UnselfmuteView
-from src.mongo.models import Censor, Cron, Event, Ping, Settings, Tag
+from src.mongo.models import Censor, Cron, CronDeadLetter, Event, Settings, Tag
 
 if TYPE_CHECKING:
     from bot import PiBot
 
+    from .censor import Censor as CensorCog
+    from .ping import PingManager
     from .reporter import Reporter
 
 
@@ -26,8 +30,16 @@ logger = logging.getLogger(__name__)
 
 
 class CronTasks(commands.Cog):
+    scheduler: CronScheduler
+    member_counter: MemberCounter
+
     def __init__(self, bot: PiBot):
         self.bot = bot
+        self.scheduler = CronScheduler(
+            self.execute_cron_task,
+            invalid_handler=self.report_dead_cron_task,
+        )
+        self.member_counter = MemberCounter()
 
     @commands.Cog.listener()
     async def on_ready(self) -> None:
@@ -45,7 +57,7 @@ class CronTasks(commands.Cog):
             logger.error("Error in starting function with updating tournament list:")
             traceback.print_exc()
 
-        self.cron.start()
+        self.scheduler.start()
         self.change_bot_status.start()
         self.send_unselfmute.start()
         self.update_member_count.start()
@@ -58,25 +70,27 @@ class CronTasks(commands.Cog):
             name=src.discord.globals.CHANNEL_UNSELFMUTE,
         )
         assert isinstance(unselfmute_channel, discord.TextChannel)
-        messages = [msg async for msg in unselfmute_channel.history()]
-        if messages:
-            await messages[0].edit(view=UnselfmuteView(self.bot))
-        else:  # No message exists in the channel yet!
-            embed = discord.Embed(
-                description="""
-                                  Clicking the reaction below will remove your selfmute, allowing you access back to the server. All of the remaining time on your selfmute will be removed. If you have questions, please DM a moderator.
-                                  """,
-                color=discord.Color.brand_red(),
-            )
-            await unselfmute_channel.send(embed=embed, view=UnselfmuteView(self.bot))
+        embed = discord.Embed(
+            description="""
+                              Clicking the reaction below will remove your selfmute, allowing you access back to the server. All of the remaining time on your selfmute will be removed. If you have questions, please DM a moderator.
+                              """,
+            color=discord.Color.brand_red(),
+        )
+        await self.bot.panels.ensure(
+            "unselfmute",
+            unselfmute_channel,
+            embed=embed,
+            view=UnselfmuteView(self.bot),
+        )
 
     def cog_unload(self):
-        self.cron.cancel()
+        self.scheduler.stop()
         self.change_bot_status.cancel()
         self.update_member_count.cancel()
 
     async def pull_prev_info(self):
-        src.discord.globals.PING_INFO = await Ping.find_all().to_list()
+        ping_cog: commands.Cog | PingManager = self.bot.get_cog("PingManager")
+        await ping_cog.reload_pings()
         src.discord.globals.TAGS = await Tag.find_all().to_list()
         src.discord.globals.EVENT_INFO = await Event.find_all().to_list()
         settings = await Settings.find_one({})
@@ -108,6 +122,9 @@ class CronTasks(commands.Cog):
         if not src.discord.globals.CENSOR:
             src.discord.globals.CENSOR = Censor(words=[], emojis=[])
             await src.discord.globals.CENSOR.save()
+        censor_cog: commands.Cog | CensorCog = self.bot.get_cog("Censor")
+        censor_cog.refresh_matcher()
+        await self.member_counter.load()
         logger.info("Fetched previous variables.")
 
     async def schedule_unban(
@@ -118,7 +135,9 @@ class CronTasks(commands.Cog):
         """
         Schedules for a particular Discord user to be unbanned at a particular time.
         """
-        await Cron(type="UNBAN", user=user.id, time=time, tag=str(user)).insert()
+        task = Cron(type="UNBAN", user=user.id, time=time, tag=str(user))
+        await task.insert()
+        self.scheduler.add(task)
 
     async def schedule_unmute(
         self,
@@ -128,7 +147,9 @@ class CronTasks(commands.Cog):
         """
         Schedules for a particular Discord user to be unmuted at a particular time.
         """
-        await Cron(type="UNMUTE", user=user.id, time=time, tag=str(user)).insert()
+        task = Cron(type="UNMUTE", user=user.id, time=time, tag=str(user))
+        await task.insert()
+        self.scheduler.add(task)
 
     async def schedule_unselfmute(
         self,
@@ -138,18 +159,32 @@ class CronTasks(commands.Cog):
         """
         Schedules for a particular Discord user to be un-selfmuted at a particular time.
         """
-        await Cron(type="UNSELFMUTE", user=user.id, time=time, tag=str(user)).insert()
+        task = Cron(type="UNSELFMUTE", user=user.id, time=time, tag=str(user))
+        await task.insert()
+        self.scheduler.add(task)
 
     async def schedule_status_remove(self, time: datetime.datetime) -> None:
         """
         Schedules Pi-Bot's status to be removed at a specific time.
         """
-        await Cron(
+        task = Cron(
             type="REMOVE_STATUS",
             time=time,
             user=0,
             tag="",
-        ).insert()  # FIXME: Make user and time fields somehow depend on `type`
+        )  # FIXME: Make user and time fields somehow depend on `type`
+        await task.insert()
+        self.scheduler.add(task)
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member: discord.Member):
+        if member.guild.id == env.server_id:
+            await self.member_counter.record_join(member.guild.member_count or 0)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: discord.Member):
+        if member.guild.id == env.server_id:
+            await self.member_counter.record_leave(member.guild.member_count or 0)
 
     @tasks.loop(minutes=5)
     async def update_member_count(self):
@@ -163,68 +198,61 @@ class CronTasks(commands.Cog):
             lambda c: channel_prefix in c.name,
             guild.voice_channels,
         )
-        left_channel = discord.utils.get(
-            guild.text_channels,
-            name=src.discord.globals.CHANNEL_LEAVE,
-        )
 
         # Type checking
         assert isinstance(guild, discord.Guild)
         assert isinstance(vc, discord.VoiceChannel)
-        assert isinstance(left_channel, discord.TextChannel)
 
         # Get relevant stats
         member_count = guild.member_count
-        joined_today = len(
-            [
-                m
-                for m in guild.members
-                if isinstance(m.joined_at, datetime.datetime)
-                and m.joined_at.date() == discord.utils.utcnow().date()
-            ],
-        )
-        left_messages = [c async for c in left_channel.history(limit=200)]
-        left_today = len(
-            [
-                m
-                for m in left_messages
-                if m.created_at.date() == discord.utils.utcnow().date()
-            ],
-        )
+        joined_today, left_today = self.member_counter.today
 
-        # Edit the voice channel
-        await vc.edit(name=f"{member_count} Members (+{joined_today}/-{left_today})")
+        # Edit the voice channel, only if the count changed
+        name = f"{member_count} Members (+{joined_today}/-{left_today})"
+        if vc.name != name:
+            await vc.edit(name=name)
         logger.debug("Refreshed member count.")
 
-    @tasks.loop(minutes=1)
-    async def cron(self) -> None:
+    async def execute_cron_task(self, task: Cron) -> None:
         """
-        The main CRON handler, running every minute. On every execution of the function, all CRON tasks are fetched and are evaluated to check if they are old and action needs to be taken.
+        The main CRON handler, called by the scheduler when a CRON task is due.
+
+        A task which fails is retried from the start, so a handler which fails
+        after its notice was sent (such as when deleting the task) sends the
+        notice again on the retry.
         """
-        logger.debug("Executing CRON...")
-        # Get the relevant tasks
-        cron_list = await Cron.find_all().to_list()
+        logger.debug(f"Executing CRON task {task.id}...")
+        try:
+            if task.cron_type == "UNBAN":
+                await self.cron_handle_unban(task)
+            elif task.cron_type == "UNMUTE":
+                await self.cron_handle_unmute(task)
+            elif task.cron_type == "UNSELFMUTE":
+                await self.cron_handle_unselfmute(task)
+            elif task.cron_type == "REMOVE_STATUS":
+                await self.cron_handle_remove_status(task)
+        except Exception as e:
+            logger.exception(
+                f"CRON task {task.id} failed (attempt {task.attempts + 1}).",
+            )
+            if not await self.scheduler.retry_later(task, e):
+                await self.give_up_cron_task(task)
 
-        for task in cron_list:
-            # If the date has passed, execute task
-            if discord.utils.utcnow() > task.time:
-                try:
-                    if task.cron_type == "UNBAN":
-                        await self.cron_handle_unban(task)
-                    elif task.cron_type == "UNMUTE":
-                        await self.cron_handle_unmute(task)
-                    elif task.cron_type == "UNSELFMUTE":
-                        await self.cron_handle_unselfmute(task)
-                    elif task.cron_type == "REMOVE_STATUS":
-                        await self.cron_handle_remove_status(task)
-                    else:
-                        logger.error("ERROR:")
-                        reporter_cog = self.bot.get_cog("Reporter")
-                        await reporter_cog.create_cron_task_report(task)
-                except Exception:
-                    traceback.print_exc()
-                    reporter_cog: commands.Cog | Reporter = self.bot.get_cog("Reporter")
-                    await reporter_cog.create_cron_task_report(task)
+    async def give_up_cron_task(self, task: Cron) -> None:
+        """
+        Moves a CRON task which will no longer be retried to the dead-letter
+        collection and reports it to staff, once.
+        """
+        dead = await self.scheduler.dead_letter(task)
+        await self.report_dead_cron_task(dead)
+
+    async def report_dead_cron_task(self, dead: CronDeadLetter) -> None:
+        """
+        Reports a CRON task which was moved to the dead-letter collection to
+        staff.
+        """
+        reporter_cog: commands.Cog | Reporter = self.bot.get_cog("Reporter")
+        await reporter_cog.create_cron_task_report(dead)
 
     async def cron_handle_unban(self, task: Cron):
         """
@@ -256,7 +284,7 @@ class CronTasks(commands.Cog):
                 already_unbanned=already_unbanned,
             )
 
-        # Remove cron task.
+        # Remove cron task. If this fails, the retry sends the notice above again.
         await task.delete()
 
     async def cron_handle_unmute(self, task: Cron):
@@ -285,7 +313,7 @@ class CronTasks(commands.Cog):
             # User is not in server, thus no unmute can occur
             await reporter_cog.create_cron_unmute_auto_notice(member, is_present=False)
 
-        # Remove cron task.
+        # Remove cron task. If this fails, the retry sends the notice above again.
         await task.delete()
 
     async def cron_handle_unselfmute(self, task: Cron):
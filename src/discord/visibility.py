@@ -0,0 +1,80 @@
+"""
+Holds a cache of which members can see which channels.
+"""
+from __future__ import annotations
+
+import collections
+
+import discord
+
+
+class ChannelVisibilityCache:
+    """
+    Caches, for each text channel, the ids of the members who can see it, so
+    checking whether a member can see a channel is O(1) instead of computing the
+    permissions of every member in the server.
+
+    A channel's entry is computed on first use and kept until the channel's
+    permission overwrites or the server's roles change. Member joins, leaves and
+    role changes update the cached entries incrementally. Other channel types
+    (such as threads) are not cached.
+    """
+
+    visible: collections.OrderedDict[int, set[int]]
+
+    def __init__(self, max_channels: int = 256):
+        self.max_channels = max_channels
+        self.visible = collections.OrderedDict()
+
+    def can_see(self, channel: discord.abc.Messageable, user_id: int) -> bool:
+        """
+        Returns whether the member with the given id can see the channel.
+        """
+        if not isinstance(channel, discord.TextChannel):
+            return any(m.id == user_id for m in getattr(channel, "members", []))
+
+        ids = self.visible.get(channel.id)
+        if ids is None:
+            ids = {m.id for m in channel.members}
+            self.visible[channel.id] = ids
+            if len(self.visible) > self.max_channels:
+                self.visible.popitem(last=False)
+        else:
+            self.visible.move_to_end(channel.id)
+        return user_id in ids
+
+    def invalidate_channel(self, channel_id: int) -> None:
+        """
+        Drops the cached entry of a channel, such as after its permission
+        overwrites changed.
+        """
+        self.visible.pop(channel_id, None)
+
+    def clear(self) -> None:
+        """
+        Drops every cached entry, such as after a role's permissions changed.
+        """
+        self.visible.clear()
+
+    def update_member(self, member: discord.Member) -> None:
+        """
+        Recomputes whether a member can see each cached channel, such as after
+        the member joined or their roles changed.
+        """
+        for channel_id, ids in self.visible.items():
+            channel = member.guild.get_channel(channel_id)
+            if not isinstance(channel, discord.TextChannel):
+                continue  # Channel belongs to another server
+            if channel.permissions_for(member).read_messages:
+                ids.add(member.id)
+            else:
+                ids.discard(member.id)
+
+    def remove_member(self, member: discord.Member) -> None:
+        """
+        Removes a member who left the server from every cached channel of that
+        server.
+        """
+        for channel_id, ids in self.visible.items():
+            if member.guild.get_channel(channel_id) is not None:
+                ids.discard(member.id)
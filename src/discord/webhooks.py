@@ -0,0 +1,96 @@
+"""
+Holds the webhook pool used by cogs which repost content on behalf of users.
+"""
+from __future__ import annotations
+
+import asyncio
+import collections
+import logging
+from typing import TYPE_CHECKING, Any
+
+import discord
+
+if TYPE_CHECKING:
+    from bot import PiBot
+
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_NAME = "Censor (Automated)"
+
+
+class WebhookPool:
+    """
+    Keeps one long-lived webhook per channel for reposting messages as users.
+
+    Webhooks are looked up from the channel's existing webhooks on first use (and
+    only created if none belonging to Pi-Bot exists), then kept in an LRU cache.
+    Reposting therefore costs a single request in the steady state. If a cached
+    webhook was deleted out from under the pool, it is recreated once and the
+    send is retried.
+    """
+
+    webhooks: collections.OrderedDict[int, discord.Webhook]
+
+    def __init__(self, bot: PiBot, max_channels: int = 128):
+        self.bot = bot
+        self.max_channels = max_channels
+        self.webhooks = collections.OrderedDict()
+        self._locks: dict[int, asyncio.Lock] = {}
+
+    async def get(self, channel: discord.TextChannel) -> discord.Webhook:
+        """
+        Gets the pooled webhook for a channel, looking it up or creating it if
+        it is not cached yet.
+        """
+        webhook = self.webhooks.get(channel.id)
+        if webhook is not None:
+            self.webhooks.move_to_end(channel.id)
+            return webhook
+
+        # Avoid creating several webhooks for one channel during a burst
+        async with self._locks.setdefault(channel.id, asyncio.Lock()):
+            webhook = self.webhooks.get(channel.id)
+            if webhook is not None:
+                return webhook
+
+            webhook = discord.utils.find(
+                lambda w: w.name == WEBHOOK_NAME
+                and w.token is not None
+                and w.user == self.bot.user,
+                await channel.webhooks(),
+            )
+            if webhook is None:
+                webhook = await channel.create_webhook(name=WEBHOOK_NAME)
+                logger.debug(f"Created pooled webhook for #{channel}.")
+
+            self.webhooks[channel.id] = webhook
+            if len(self.webhooks) > self.max_channels:
+                evicted_id, _ = self.webhooks.popitem(last=False)
+                self._locks.pop(evicted_id, None)
+            return webhook
+
+    def discard(self, channel_id: int) -> None:
+        """
+        Forgets the cached webhook for a channel, such as after it was deleted.
+        """
+        self.webhooks.pop(channel_id, None)
+
+    async def send(
+        self,
+        channel: discord.TextChannel,
+        content: str,
+        **kwargs: Any,
+    ) -> None:
+        """
+        Sends a message through the channel's pooled webhook. Accepts the same
+        keyword arguments as discord.Webhook.send.
+        """
+        webhook = await self.get(channel)
+        try:
+            await webhook.send(content, **kwargs)
+        except discord.NotFound:
+            logger.info(f"Pooled webhook for #{channel} was deleted; recreating it.")
+            self.discard(channel.id)
+            webhook = await self.get(channel)
+            await webhook.send(content, **kwargs)
@@ -423,16 +423,9 @@ class WelcomeCog(commands.GroupCog, name="welcome"):
         )
         assert isinstance(channel, discord.TextChannel)
 
-        history = [m async for m in channel.history(limit=1)]
         embed = self.generate_welcome_embed()
         view = InitialView(self.bot)
-        if not history:
-            await channel.send(embed=embed, view=view)
-        elif (
-            not history[0].embeds
-            or history[0].embeds[0].description != embed.description
-        ):
-            await history[0].edit(embed=embed, view=view)
+        await self.bot.panels.ensure("welcome", channel, embed=embed, view=view)
 
 
 async def setup(bot: PiBot):
@@ -19,12 +19,34 @@ class Cron(Document):
     time: Annotated[datetime, Indexed()]
     user: int
     tag: str
+    # Retry state, set once the task has failed at least once
+    attempts: int = 0
+    next_attempt: datetime | None = None
+    last_error: str | None = None
 
     class Settings:
         name = "cron"
         use_cache = False
 
 
+class CronDeadLetter(Document):
+    """
+    A CRON task which failed too many times and will no longer be retried.
+    """
+
+    cron_type: str = Field(alias="type")
+    time: datetime
+    user: int
+    tag: str
+    attempts: int
+    last_error: str | None
+    failed_at: datetime
+
+    class Settings:
+        name = "cron_dead_letter"
+        use_cache = False
+
+
 class Ping(Document):
     user_id: Annotated[int, Indexed()]
     word_pings: list[str]
@@ -86,10 +108,48 @@ class Censor(Document):
         use_cache = True
 
 
+class Panel(Document):
+    """
+    A message owned by Pi-Bot which it keeps up to date, such as the welcome
+    message.
+    """
+
+    name: Annotated[str, Indexed(unique=True)]
+    channel_id: int
+    message_id: int
+    # A hash of the last content the message was sent or edited with
+    content_hash: str
+
+    class Settings:
+        name = "panels"
+        use_cache = False
+
+
+class MemberCountDay(Document):
+    """
+    The number of members who joined and left the server on a single UTC day.
+    """
+
+    day: Annotated[datetime, Indexed(unique=True)]
+    joins: int
+    leaves: int
+    # The member count when the day's counters were last updated
+    member_count: int
+
+    class Settings:
+        name = "member_counts"
+        use_cache = False
+
+
 class Settings(Document):
     custom_bot_status_type: str | None
     custom_bot_status_text: str | None
     invitational_season: int
+    # Message rate limits, as messages per second and the size of allowed bursts
+    member_message_rate: float = 0.5
+    member_message_burst: int = 10
+    channel_message_rate: float = 3
+    channel_message_burst: int = 60
 
     class Settings:
         name = "settings"
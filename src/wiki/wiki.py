@@ -6,24 +6,27 @@ import pywikibot
 import wikitextparser as wtp
 from aioify import aioify
 
-from env import env
-
 aiopwb = aioify(obj=pywikibot, name="aiopwb")
 
 site = None
 logger = logging.getLogger(__name__)
 
 
-async def init_wiki(username: str, password: str):
-    """Initializes the wiki function."""
+def _write_password_file(username: str, password: str):
     with open("password.py", "w+") as f:
         f.write(
             f'("{username}", "{password}")',
         )
+
+
+async def init_wiki(username: str, password: str):
+    """Initializes the wiki function. The blocking file write and login run on a
+    worker thread, so this can run in the background while the bot starts."""
+    await asyncio.to_thread(_write_password_file, username, password)
     global site
     site = await aiopwb.Site()
-    site.login()
-    print("Wiki initialized.")
+    await asyncio.to_thread(site.login)
+    logger.info("Wiki initialized.")
 
 
 async def get_page_text(page_name):
@@ -95,9 +98,3 @@ async def implement_command(action, page_title):
             t = search.title()
             res.append(t)
         return res[:5]
-
-
-if env.pi_bot_wiki_username and env.pi_bot_wiki_password:
-    asyncio.run(init_wiki(env.pi_bot_wiki_username, env.pi_bot_wiki_password))
-else:
-    logger.info("User did not supply keys for wiki functionality; not turned on.")
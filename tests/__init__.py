@@ -0,0 +1,3 @@
+"""
+Tests for Pi-Bot's self-contained logic, which can run without Discord or Mongo.
+"""
@@ -0,0 +1,38 @@
+import types
+
+import pytest
+
+
+class FakeClock:
+    """
+    A clock which only moves when a test advances `now`.
+    """
+
+    def __init__(self, monkeypatch: pytest.MonkeyPatch):
+        self.monkeypatch = monkeypatch
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def install(self, module: types.ModuleType) -> None:
+        """
+        Replaces the `time` module seen by a module, so that its calls to
+        time.monotonic read this clock without affecting any other module.
+        """
+        self.monkeypatch.setattr(
+            module,
+            "time",
+            types.SimpleNamespace(monotonic=self),
+        )
+
+    def patch(self, target: object, name: str) -> None:
+        """
+        Replaces a clock function, such as discord.utils.utcnow, with this clock.
+        """
+        self.monkeypatch.setattr(target, name, self)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    return FakeClock(monkeypatch)
@@ -0,0 +1,169 @@
+import asyncio
+import datetime
+
+import pytest
+
+pytest.importorskip("discord")
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+from beanie import PydanticObjectId, init_beanie  # noqa: E402
+
+from src.discord.cronscheduler import CronScheduler  # noqa: E402
+from src.mongo.models import Cron, CronDeadLetter  # noqa: E402
+
+
+def run(test):
+    async def main():
+        await init_beanie(
+            database=mongomock_motor.AsyncMongoMockClient(tz_aware=True)["test"],
+            document_models=[Cron, CronDeadLetter],
+        )
+        await test()
+
+    asyncio.run(main())
+
+
+async def noop(*args):
+    return None
+
+
+async def insert_task(cron_type: str = "UNMUTE") -> Cron:
+    task = Cron(
+        cron_type=cron_type,
+        time=datetime.datetime.now(datetime.timezone.utc),
+        user=1,
+        tag="member",
+    )
+    await task.insert()
+    return task
+
+
+def test_failed_tasks_are_retried_with_exponential_backoff():
+    async def test():
+        scheduler = CronScheduler(
+            noop,
+            base_delay=datetime.timedelta(minutes=1),
+            max_attempts=5,
+        )
+        task = await insert_task()
+        for attempt, delay_minutes in enumerate((1, 2, 4, 8), start=1):
+            before = datetime.datetime.now(datetime.timezone.utc)
+            assert await scheduler.retry_later(task, RuntimeError("boom"))
+
+            stored = await Cron.get(task.id)
+            assert stored.attempts == attempt
+            assert stored.last_error == "RuntimeError: boom"
+            delay = task.next_attempt - before
+            assert abs(delay - datetime.timedelta(minutes=delay_minutes)) < (
+                datetime.timedelta(seconds=5)
+            )
+
+        # The fifth failure gives up without rescheduling
+        assert not await scheduler.retry_later(task, RuntimeError("boom"))
+        assert task.attempts == 5
+        assert (await Cron.get(task.id)).attempts == 4
+
+    run(test)
+
+
+def test_retried_tasks_are_due_at_their_next_attempt():
+    async def test():
+        scheduler = CronScheduler(noop)
+        task = await insert_task()
+        assert scheduler.due(task) == task.time
+
+        await scheduler.retry_later(task, RuntimeError("boom"))
+        assert scheduler.due(task) == task.next_attempt
+
+    run(test)
+
+
+def test_given_up_tasks_are_dead_lettered():
+    async def test():
+        scheduler = CronScheduler(noop)
+        task = await insert_task()
+        task.attempts = 5
+        task.last_error = "RuntimeError: boom"
+
+        dead = await scheduler.dead_letter(task)
+        assert await Cron.get(task.id) is None
+        stored = await CronDeadLetter.get(dead.id)
+        assert stored.cron_type == "UNMUTE"
+        assert stored.attempts == 5
+        assert stored.last_error == "RuntimeError: boom"
+
+    run(test)
+
+
+def test_invalid_tasks_are_dead_lettered_on_load():
+    async def test():
+        reported = []
+
+        async def report(dead):
+            reported.append(dead)
+
+        scheduler = CronScheduler(noop, invalid_handler=report)
+        valid = await insert_task()
+        await Cron.get_motor_collection().insert_one(
+            {
+                "type": "UNKNOWN",
+                "time": datetime.datetime.now(datetime.timezone.utc),
+                "user": 2,
+                "tag": "member",
+            },
+        )
+
+        await scheduler.load()
+        assert [task.id for _, _, task in scheduler.heap] == [valid.id]
+        assert await Cron.count() == 1
+        assert [dead.cron_type for dead in reported] == ["UNKNOWN"]
+        assert await CronDeadLetter.count() == 1
+
+    run(test)
+
+
+def test_tasks_added_during_load_are_scheduled(monkeypatch):
+    async def test():
+        scheduler = CronScheduler(noop)
+        now = datetime.datetime.now(datetime.timezone.utc)
+        # The previous load covered up to now, and this load extends the horizon
+        scheduler.loaded_until = now
+        await insert_task()
+        # Inserted after the query has already read past it
+        added = Cron(
+            id=PydanticObjectId(),
+            cron_type="UNMUTE",
+            time=now + datetime.timedelta(minutes=30),
+            user=2,
+            tag="member",
+        )
+
+        model_validate = Cron.model_validate
+
+        def validate_and_add(document):
+            # Scheduled by a command while the load is still reading tasks
+            scheduler.add(added)
+            return model_validate(document)
+
+        monkeypatch.setattr(Cron, "model_validate", validate_and_add)
+        await scheduler.load()
+        assert added.id in scheduler.scheduled
+        assert scheduler.loaded_until > now
+
+    run(test)
+
+
+def test_failed_load_is_retried():
+    async def test():
+        scheduler = CronScheduler(noop)
+
+        def fail(*args, **kwargs):
+            raise RuntimeError("database unavailable")
+
+        collection = Cron.get_motor_collection()
+        collection.find = fail
+        with pytest.raises(RuntimeError):
+            await scheduler.load()
+        assert scheduler.loaded_until is None
+
+    run(test)
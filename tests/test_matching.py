@@ -0,0 +1,111 @@
+import asyncio
+import time
+
+import pytest
+import regex
+
+from src.discord.matching import (
+    CENSOR_REPLACEMENT,
+    CensorMatcher,
+    MatchPoolFullError,
+    MatchWorkerPool,
+)
+
+# Backtracks over every way of splitting the words, so it never finishes on SLOW_TEXT
+SLOW_PATTERN = r"(?:\w+\s?)*\d"
+SLOW_TEXT = "ab " * 2000 + "!"
+
+
+def matcher(words=(), emojis=()) -> CensorMatcher:
+    censor = CensorMatcher()
+    censor.rebuild(words, emojis)
+    return censor
+
+
+def test_empty_list_matches_nothing():
+    censor = matcher()
+    assert censor.pattern is None
+    assert not censor.search("anything")
+    assert censor.censor("anything") == ("anything", 0)
+
+
+def test_words_match_whole_words_ignoring_case():
+    censor = matcher(words=["darn"])
+    assert censor.search("Well, DARN it")
+    assert not censor.search("darnation")
+    assert censor.censor("darn, darn") == (
+        f"{CENSOR_REPLACEMENT}, {CENSOR_REPLACEMENT}",
+        2,
+    )
+
+
+def test_emojis_match_anywhere():
+    censor = matcher(emojis=["🍆"])
+    assert censor.censor("a🍆b") == (f"a{CENSOR_REPLACEMENT}b", 1)
+
+
+def test_invalid_entries_are_skipped():
+    censor = matcher(words=["(broken", "fine"])
+    assert censor.search("fine")
+    assert not censor.search("(broken")
+
+
+def test_rebuild_bumps_version():
+    censor = matcher(words=["one"])
+    version = censor.version
+    censor.rebuild(["two"], [])
+    assert censor.version == version + 1
+    assert not censor.search("one")
+    assert censor.search("two")
+
+
+def test_search_times_out():
+    censor = matcher(words=[SLOW_PATTERN])
+    with pytest.raises(TimeoutError):
+        censor.search(SLOW_TEXT, timeout=0.01)
+
+
+def test_pool_passes_its_time_budget():
+    def check(text, timeout=None):
+        return text, timeout
+
+    async def main():
+        pool = MatchWorkerPool(timeout=0.25)
+        try:
+            return await pool.run(check, "text")
+        finally:
+            pool.shutdown()
+
+    assert asyncio.run(main()) == ("text", 0.25)
+
+
+def test_pool_raises_timeouts_from_matches():
+    pattern = regex.compile(SLOW_PATTERN)
+
+    async def main():
+        pool = MatchWorkerPool(timeout=0.01)
+        try:
+            await pool.run(pattern.search, SLOW_TEXT)
+        finally:
+            pool.shutdown()
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(main())
+
+
+def test_full_pool_applies_backpressure():
+    def slow(timeout=None):
+        time.sleep(0.2)
+
+    async def main():
+        pool = MatchWorkerPool(max_workers=1, max_queued=0, queue_timeout=0.01)
+        try:
+            busy = asyncio.create_task(pool.run(slow))
+            await asyncio.sleep(0)
+            with pytest.raises(MatchPoolFullError):
+                await pool.run(slow)
+            await busy
+        finally:
+            pool.shutdown()
+
+    asyncio.run(main())
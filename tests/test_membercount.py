@@ -0,0 +1,45 @@
+import datetime
+
+import pytest
+
+from src.discord import membercount
+from src.discord.membercount import MemberCounter, utc_day
+
+
+@pytest.fixture(autouse=True)
+def _clock(clock):
+    clock.now = datetime.datetime(2024, 3, 1, 23, 59, tzinfo=datetime.timezone.utc)
+    clock.patch(membercount.discord.utils, "utcnow")
+
+
+def test_utc_day_converts_to_utc_midnight():
+    moment = datetime.datetime(
+        2024,
+        3,
+        1,
+        20,
+        30,
+        tzinfo=datetime.timezone(datetime.timedelta(hours=-5)),
+    )
+    assert utc_day(moment) == datetime.datetime(
+        2024,
+        3,
+        2,
+        tzinfo=datetime.timezone.utc,
+    )
+
+
+async def _noop(*args, **kwargs):
+    return None
+
+
+def test_counters_roll_over_at_utc_midnight(clock, monkeypatch):
+    counter = MemberCounter()
+    monkeypatch.setattr(counter, "_persist", _noop)
+    counter.joins = 3
+    counter.leaves = 1
+    assert counter.today == (3, 1)
+
+    clock.now += datetime.timedelta(minutes=2)
+    assert counter.today == (0, 0)
+    assert counter.day == datetime.datetime(2024, 3, 2, tzinfo=datetime.timezone.utc)
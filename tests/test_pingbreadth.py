@@ -0,0 +1,46 @@
+import types
+
+import pytest
+import regex
+
+from src.discord.pingbreadth import PingBreadthAnalyzer
+
+
+def features(text: str):
+    return types.SimpleNamespace(content=text)
+
+
+def test_hit_rate_counts_each_message_once():
+    texts = ("apple apple", "banana", "apple pie", "cherry")
+    pattern = regex.compile(r"\bapple\b")
+    assert PingBreadthAnalyzer.hit_rate(texts, pattern) == pytest.approx(0.5)
+
+
+def test_patterns_do_not_match_across_messages():
+    texts = ("ends with foo", "bar starts this one")
+    for pattern in (r"foo\sbar", r"foo.bar", r"foo\W+bar"):
+        assert PingBreadthAnalyzer.hit_rate(texts, regex.compile(pattern)) == 0
+
+
+def test_exhausted_budget_times_out():
+    texts = ("a" * 100,) * 10
+    with pytest.raises(TimeoutError):
+        PingBreadthAnalyzer.hit_rate(texts, regex.compile("b"), timeout=0)
+
+
+def test_snapshot_requires_min_sample():
+    analyzer = PingBreadthAnalyzer(sample_size=10, min_sample=3)
+    analyzer.record(features("one"))
+    analyzer.record(features("   "))
+    analyzer.record(features("two"))
+    assert analyzer.snapshot() is None
+
+    analyzer.record(features("three"))
+    assert analyzer.snapshot() == ("one", "two", "three")
+
+
+def test_sample_is_bounded():
+    analyzer = PingBreadthAnalyzer(sample_size=2, min_sample=1)
+    for text in ("one", "two", "three"):
+        analyzer.record(features(text))
+    assert analyzer.snapshot() == ("two", "three")
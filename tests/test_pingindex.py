@@ -0,0 +1,56 @@
+import pytest
+
+from src.discord.features import MessageFeatures
+from src.discord.pingindex import PingIndex, PingRejectedError, compile_ping
+
+
+def match(index: PingIndex, content: str) -> dict[int, int]:
+    features = MessageFeatures(content)
+    matches = index.match_literals(features)
+    regex_matches, timed_out = PingIndex.match_regexes(
+        index.regex_snapshot(),
+        features.content,
+    )
+    assert not timed_out
+    matches.update(regex_matches)
+    return dict(matches)
+
+
+def test_literal_pings_ignore_case():
+    index = PingIndex()
+    index.add(1, "Science Olympiad")
+    index.add(2, "pi")
+    assert match(index, "who runs SCIENCE olympiad?") == {1: 1}
+    assert match(index, "PI is ready, pipe is not") == {2: 1}
+
+
+def test_legacy_wrapped_pings_are_literal():
+    index = PingIndex()
+    index.add(1, r"\b(chem)\b")
+    assert match(index, "Chem lab tomorrow") == {1: 1}
+    assert not index.regex_snapshot()
+
+
+def test_pings_match_the_original_text():
+    # Compatibility characters are not normalized before matching
+    index = PingIndex()
+    index.add(1, "file")
+    index.add(2, r"cir+cuits?")
+    assert match(index, "ﬁle") == {}
+    assert match(index, "file") == {1: 1}
+    assert match(index, "Circuits") == {2: 1}
+
+
+def test_removed_pings_stop_matching():
+    index = PingIndex()
+    index.add(1, "rocks")
+    index.add(2, "rocks")
+    index.remove(1, "rocks")
+    assert match(index, "rocks and minerals") == {2: 1}
+
+
+def test_nested_quantifiers_are_rejected():
+    with pytest.raises(PingRejectedError):
+        compile_ping(r"(a+)+b")
+    with pytest.raises(PingRejectedError):
+        compile_ping(r"(unclosed")
@@ -0,0 +1,76 @@
+import pytest
+
+from src.discord import ratelimit
+from src.discord.ratelimit import TokenBuckets
+
+
+@pytest.fixture(autouse=True)
+def _clock(clock):
+    clock.install(ratelimit)
+
+
+def test_burst_is_allowed_without_strikes(clock):
+    buckets = TokenBuckets()
+    for _ in range(5):
+        bucket = buckets.take("member", rate=1, burst=5)
+    assert bucket.strikes == 0
+    assert bucket.tokens == pytest.approx(0)
+
+
+def test_messages_over_the_limit_count_strikes(clock):
+    buckets = TokenBuckets()
+    for _ in range(5):
+        buckets.take("member", rate=1, burst=5)
+    assert buckets.take("member", rate=1, burst=5).strikes == 1
+    assert buckets.take("member", rate=1, burst=5).strikes == 2
+
+
+def test_partial_refill_keeps_strikes(clock):
+    buckets = TokenBuckets()
+    for _ in range(6):
+        buckets.take("member", rate=1, burst=5)
+
+    clock.now += 2
+    bucket = buckets.take("member", rate=1, burst=5)
+    assert bucket.strikes == 1
+    assert bucket.tokens == pytest.approx(1)
+
+
+def test_full_refill_resets_strikes(clock):
+    buckets = TokenBuckets()
+    for _ in range(7):
+        buckets.take("member", rate=1, burst=5)
+
+    clock.now += 4
+    buckets.take("other", rate=1, burst=5)
+    assert buckets.take("member", rate=1, burst=5).strikes == 2
+
+    # "other" is now the least recently used bucket and is not idle long enough
+    # to be evicted, so "member" is refilled rather than replaced
+    clock.now += 4.5
+    bucket = buckets.take("member", rate=1, burst=5)
+    assert "other" in buckets.buckets
+    assert bucket.strikes == 0
+
+    for _ in range(4):
+        buckets.take("member", rate=1, burst=5)
+    # A new flood starts counting from the first strike again
+    assert buckets.take("member", rate=1, burst=5).strikes == 1
+
+
+def test_idle_buckets_are_evicted(clock):
+    buckets = TokenBuckets()
+    buckets.take("a", rate=1, burst=5)
+    clock.now += 3
+    buckets.take("b", rate=1, burst=5)
+
+    clock.now += 2
+    buckets.take("c", rate=1, burst=5)
+    assert list(buckets.buckets) == ["b", "c"]
+
+
+def test_keys_are_independent(clock):
+    buckets = TokenBuckets()
+    for _ in range(6):
+        buckets.take("a", rate=1, burst=5)
+    assert buckets.take("b", rate=1, burst=5).strikes == 0
@@ -0,0 +1,71 @@
+import types
+
+import pytest
+
+from src.discord.similarity import NearDuplicateIndex
+
+RAID = "join our server now for free nitro giveaways and more"
+
+
+def features(text: str):
+    return types.SimpleNamespace(text=text, content=text)
+
+
+def add(index: NearDuplicateIndex, author_id: int, channel_id: int, text: str):
+    return index.add(author_id, channel_id, features(text), index.signature(text))
+
+
+def test_short_messages_are_ignored():
+    index = NearDuplicateIndex(min_length=20)
+    assert index.signature("hello there") is None
+    assert add(index, 1, 1, "hello there") is None
+    assert not index.entries
+
+
+def test_signature_only_reads_max_length():
+    index = NearDuplicateIndex(max_length=64)
+    text = "a different start to this message which is long " * 2
+    assert index.signature(text) == index.signature(text + "and a different end")
+
+
+def test_exhausted_budget_times_out():
+    index = NearDuplicateIndex()
+    with pytest.raises(TimeoutError):
+        index.signature(RAID, timeout=-1)
+
+
+def test_near_duplicates_from_several_members_are_reported_once():
+    index = NearDuplicateIndex(author_threshold=3)
+    assert add(index, 1, 10, RAID) is None
+    assert add(index, 2, 11, RAID + "!") is None
+
+    cluster = add(index, 3, 12, RAID + "!!")
+    assert cluster is not None
+    assert cluster.authors == {1, 2, 3}
+    assert cluster.channels == {10, 11, 12}
+    assert cluster.message_count == 3
+
+    assert add(index, 4, 10, RAID) is None
+    assert cluster.message_count == 4
+
+
+def test_unrelated_messages_form_separate_clusters():
+    index = NearDuplicateIndex(author_threshold=2)
+    add(index, 1, 10, RAID)
+    assert (
+        add(index, 2, 10, "does anyone have notes for the anatomy event this year")
+        is None
+    )
+
+
+def test_old_messages_expire(clock):
+    from src.discord import similarity
+
+    clock.install(similarity)
+    index = NearDuplicateIndex(window_seconds=60, author_threshold=2)
+    add(index, 1, 10, RAID)
+
+    clock.now += 61
+    assert add(index, 2, 10, RAID) is None
+    assert len(index.entries) == 1
+    assert all(len(bucket) == 1 for bucket in index.buckets.values())
@@ -0,0 +1,62 @@
+import pytest
+
+from src.discord import spamwindow
+from src.discord.features import MessageFeatures
+from src.discord.spamwindow import AuthorWindows
+
+
+@pytest.fixture(autouse=True)
+def _clock(clock):
+    clock.install(spamwindow)
+
+
+def test_counts_repeated_content(clock):
+    windows = AuthorWindows(window_seconds=60)
+    features = MessageFeatures("hello there")
+    windows.add(1, features)
+    clock.now += 1
+    window = windows.add(1, MessageFeatures("Hello There"))
+    assert window.fingerprint_counts[features.fingerprint] == 2
+    assert len(window.entries) == 2
+
+
+def test_counts_caps_messages(clock):
+    windows = AuthorWindows(window_seconds=60)
+    windows.add(1, MessageFeatures("THIS IS VERY LOUD"))
+    windows.add(1, MessageFeatures("OK"))
+    window = windows.add(1, MessageFeatures("quiet now"))
+    assert window.caps_count == 1
+
+
+def test_old_messages_leave_the_window(clock):
+    windows = AuthorWindows(window_seconds=60)
+    windows.add(1, MessageFeatures("SHOUTING AT EVERYONE"))
+    clock.now += 30
+    windows.add(1, MessageFeatures("second"))
+    clock.now += 31
+    window = windows.add(1, MessageFeatures("third"))
+    assert len(window.entries) == 2
+    assert window.caps_count == 0
+    shouting = MessageFeatures("SHOUTING AT EVERYONE")
+    assert shouting.fingerprint not in window.fingerprint_counts
+
+
+def test_idle_authors_are_evicted(clock):
+    windows = AuthorWindows(window_seconds=60)
+    windows.add(1, MessageFeatures("one"))
+    clock.now += 30
+    windows.add(2, MessageFeatures("two"))
+    clock.now += 31
+    windows.add(3, MessageFeatures("three"))
+    assert list(windows.windows) == [2, 3]
+
+
+def test_active_authors_move_to_the_back(clock):
+    windows = AuthorWindows(window_seconds=60)
+    windows.add(1, MessageFeatures("one"))
+    windows.add(2, MessageFeatures("two"))
+    clock.now += 30
+    windows.add(1, MessageFeatures("again"))
+    clock.now += 31
+    windows.add(3, MessageFeatures("three"))
+    assert list(windows.windows) == [1, 3]
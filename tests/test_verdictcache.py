@@ -0,0 +1,49 @@
+from src.discord.censor import VerdictCache
+
+
+def test_only_answered_lookups_are_hits():
+    cache = VerdictCache()
+    assert cache.get(1, "bad word") is None
+    cache.set(1, "bad word", True)
+    assert cache.get(1, "bad word") is True
+    # A bare verdict does not answer a lookup for the censored form
+    assert cache.get(1, "bad word", need_censored=True) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_censored_form_is_kept():
+    cache = VerdictCache()
+    cache.set(1, "bad word", "<censored> word")
+    cache.set(1, "bad word", True)
+    assert cache.get(1, "bad word", need_censored=True) == "<censored> word"
+    assert cache.get(1, "bad word") == "<censored> word"
+
+
+def test_clean_content_is_cached():
+    cache = VerdictCache()
+    cache.set(1, "hello", False)
+    assert cache.get(1, "hello", need_censored=True) is False
+    assert cache.hits == 1
+
+
+def test_keys_use_the_exact_content():
+    cache = VerdictCache()
+    cache.set(1, "Hello", False)
+    assert cache.get(1, "hello") is None
+    assert cache.get(1, "\uFF28\uFF45\uFF4C\uFF4C\uFF4F") is None
+
+
+def test_new_version_drops_old_entries():
+    cache = VerdictCache()
+    cache.set(1, "hello", False)
+    cache.set(2, "bye", False)
+    assert cache.get(1, "hello") is None
+    assert len(cache.verdicts) == 1
+
+
+def test_size_is_bounded():
+    cache = VerdictCache(max_size=2)
+    for text in ("one", "two", "three"):
+        cache.set(1, text, False)
+    assert cache.get(1, "one") is None
+    assert cache.get(1, "three") is False